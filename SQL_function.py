@@ -1,72 +1,274 @@
 # ✅ MySQL 저장 함수
-import pymysql
-from datetime import datetime
-import pymysql.cursors
-
-MYSQL_CONFIG = {
-    "host": "127.0.0.1",        # 또는 "localhost"
-    "user": "root",
-    "password": "0000",   # ✅ 여기 본인 비밀번호 입력
-    "database": "emotion_db",   # ✅ 사전에 생성한 DB 이름
-    "charset": "utf8mb4",
-    "cursorclass": pymysql.cursors.DictCursor
-}
+import os
+import threading
+from datetime import datetime, timedelta
+from cache_utils import MISS, LRUTTLCache
+from db import connection  # 접속 정보와 커넥션 풀은 db.py (환경 변수) 에서 관리
+from mission_catalog import mission_catalog
+from summary_cache import summary_cache
+from write_behind import WriteBehindBuffer
+
+INSERT_CONVERSATION_LOG = """
+    INSERT INTO conversation_log (chat_id, date, user_text, gpt_text)
+    VALUES (%s, %s, %s, %s)
+"""
+INSERT_EMOTION_LOG = "INSERT INTO emotion_logs (sentence, top_emotion, confidence) VALUES (%s, %s, %s)"
+
+# WRITE_BEHIND=1 이면 로그 INSERT 는 큐에 넣고 바로 반환 (큐가 가득 차면 동기 저장)
+log_buffer = WriteBehindBuffer({
+    "conversation_log": INSERT_CONVERSATION_LOG,
+    "emotion_logs": INSERT_EMOTION_LOG,
+}).register_shutdown()
 
 def save_full_log(chat_id, user_text, gpt_text, date):
-    connection = pymysql.connect(**MYSQL_CONFIG)
-    with connection.cursor() as cursor:
-        query = """
-            INSERT INTO conversation_log (chat_id, date, user_text, gpt_text)
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(query, (chat_id, date, user_text, gpt_text))
-        connection.commit()
+    if log_buffer.submit("conversation_log", (chat_id, date, user_text, gpt_text)):
+        return
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(INSERT_CONVERSATION_LOG, (chat_id, date, user_text, gpt_text))
+        conn.commit()
 
 def save_to_db(sentence, emotion, confidence):
-    conn = pymysql.connect(**MYSQL_CONFIG)
-    with conn.cursor() as cursor:
-        sql = "INSERT INTO emotion_logs (sentence, top_emotion, confidence) VALUES (%s, %s, %s)"
-        cursor.execute(sql, (sentence, emotion, confidence))
-    conn.commit()
-    conn.close()
+    if log_buffer.submit("emotion_logs", (sentence, emotion, confidence)):
+        return
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(INSERT_EMOTION_LOG, (sentence, emotion, confidence))
+        conn.commit()
+
+
+
+def week_start_of(day):
+    """ISO 주의 월요일"""
+    return day - timedelta(days=day.weekday())
+
 
+def month_start_of(day):
+    return day.replace(day=1)
+
+
+# 일별 요약과 주/월 롤업 테이블 (테이블, 기간 시작일 컬럼, 날짜 → 기간 시작일)
+# 행 잠금 순서를 고정하기 위해 항상 이 순서대로 upsert 한다
+SUMMARY_TABLES = (
+    ("emotion_summary", "date", lambda day: day),
+    ("emotion_summary_weekly", "week_start", week_start_of),
+    ("emotion_summary_monthly", "month_start", month_start_of),
+)
+
+
+def _apply_emotion_summary(cursor, day, totals):
+    """
+    totals: {감정: (누적할 confidence 합, 누적할 횟수)} 를 day 의 일/주/월 행에 upsert
+    (기간, emotion) UNIQUE 키 필요 → migrations/001, 003
+    """
+    if not totals:
+        return
+    # 감정 순서를 고정해 동시 요청끼리 같은 순서로 행 잠금을 잡게 한다 (데드락 방지)
+    items = sorted(totals.items())
+    for table, column, period_of in SUMMARY_TABLES:
+        period = period_of(day)
+        rows = [(period, emo, conf, n) for emo, (conf, n) in items]
+        # pymysql 이 executemany 를 다중 VALUES 한 문장으로 합쳐 보낸다
+        cursor.executemany(f"""
+            INSERT INTO {table} ({column}, emotion, total_confidence, count)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total_confidence = total_confidence + VALUES(total_confidence),
+                count = count + VALUES(count)
+        """, rows)
 
 
 def update_emotion_summary_all(prob_dict):
-    conn = pymysql.connect(**MYSQL_CONFIG)
     today = datetime.now().date()
 
-    with conn.cursor() as cursor:
-        for emotion, confidence in prob_dict.items():
-            # 감정 존재 여부 확인
-            cursor.execute("SELECT count FROM emotion_summary WHERE date=%s AND emotion=%s", (today, emotion))
-            row = cursor.fetchone()
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            _apply_emotion_summary(cursor, today, {emo: (conf, 1) for emo, conf in prob_dict.items()})
+        conn.commit()
+    summary_cache.invalidate_volatile()  # 오늘이 포함된 요약 캐시 무효화
 
-            if row:
-                cursor.execute("""
-                    UPDATE emotion_summary
-                    SET total_confidence = total_confidence + %s,
-                        count = count + 1
-                    WHERE date = %s AND emotion = %s
-                """, (confidence, today, emotion))
-            else:
-                cursor.execute("""
-                    INSERT INTO emotion_summary (date, emotion, total_confidence, count)
-                    VALUES (%s, %s, %s, 1)
-                """, (today, emotion, confidence))
 
-    conn.commit()
-    conn.close()
+def save_predict_batch(emotion_rows, prob_dicts, log_rows):
+    """
+    /predict/batch 결과를 한 트랜잭션으로 저장
+      - emotion_rows: [(sentence, top_emotion, confidence), ...]  → emotion_logs
+      - prob_dicts  : [{감정: 확률}, ...]                        → emotion_summary (+ 주/월 롤업, 오늘 날짜)
+      - log_rows    : [(chat_id, date, user_text, gpt_text), ...] → conversation_log
+    """
+    today = datetime.now().date()
+    totals = {}
+    for probs in prob_dicts:
+        for emo, conf in probs.items():
+            total, n = totals.get(emo, (0.0, 0))
+            totals[emo] = (total + conf, n + 1)
+
+    # 예외가 나면 커밋 전이므로 풀 반환 시 전체가 롤백된다
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            if emotion_rows:
+                cursor.executemany(INSERT_EMOTION_LOG, emotion_rows)
+            _apply_emotion_summary(cursor, today, totals)
+            if log_rows:
+                cursor.executemany(INSERT_CONVERSATION_LOG, log_rows)
+        conn.commit()
+    if totals:
+        summary_cache.invalidate_volatile()
+
+# ----------------------------------------------------------
+# 감정 요약 조회 (날짜 범위는 모두 반열린 구간 [start, end) → (date, emotion) 인덱스 범위 스캔)
+# ----------------------------------------------------------
+SUMMARY_DAILY_SQL = """
+    SELECT
+        emotion,
+        ROUND(total_confidence / count, 2) AS avg_percent
+    FROM emotion_summary
+    WHERE date >= %s AND date < %s
+"""
+
+# 주/월 요약은 롤업 테이블의 한 기간(감정 수만큼의 행)만 읽는다
+SUMMARY_WEEKLY_SQL = """
+    SELECT
+        emotion,
+        ROUND(total_confidence / count, 2) AS avg_percent
+    FROM emotion_summary_weekly
+    WHERE week_start = %s
+"""
+
+SUMMARY_MONTHLY_SQL = """
+    SELECT
+        emotion,
+        ROUND(total_confidence / count, 2) AS avg_percent
+    FROM emotion_summary_monthly
+    WHERE month_start = %s
+"""
+
+SUMMARY_RANGE_SQL = """
+    SELECT
+        date,
+        emotion,
+        ROUND(total_confidence / count, 2) AS avg_percent
+    FROM emotion_summary
+    WHERE date >= %s AND date < %s
+    ORDER BY date, emotion
+"""
+
+
+def _fetch_all(sql, params):
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def get_daily_summary(day):
+    return _fetch_all(SUMMARY_DAILY_SQL, (day, day + timedelta(days=1)))
+
+
+def get_weekly_summary(week_start):
+    return _fetch_all(SUMMARY_WEEKLY_SQL, (week_start_of(week_start),))
+
+
+def get_monthly_summary(month_start):
+    return _fetch_all(SUMMARY_MONTHLY_SQL, (month_start_of(month_start),))
+
+
+def get_range_summary(start, end_exclusive):
+    return _fetch_all(SUMMARY_RANGE_SQL, (start, end_exclusive))
+
 
 def day_summarize():
-    conn = pymysql.connect(**MYSQL_CONFIG)
     today = datetime.now().date()
 
+# ----------------------------------------------------------
+# /rag/advise 용 사례 요약 (최근 이벤트부터 CASE_SUMMARY_MAX_CHARS 까지)
+#   캐시 항목은 (버전, 최대 이벤트 id, 요약). 읽을 때마다 DB 의 MAX(id) 와 비교한다.
+#   → 다른 워커의 /save_event 도 바로 반영 (idx_events_chat_id 에서 한 번 찾는 조회, 이벤트는 지우지 않음)
+#   버전은 이 프로세스의 /save_event 마다 올라가고, 그 전에 읽기 시작한 요약은 캐시에 넣지 않는다.
+#   CASE_SUMMARY_CACHE_TTL / MAXSIZE 는 메모리 정리용 (버전도 항목과 함께 제거됨)
+# ----------------------------------------------------------
+CASE_SUMMARY_MAX_CHARS = 2000
+CASE_SUMMARY_PAGE = 20
+case_summary_cache = LRUTTLCache(
+    maxsize=int(os.getenv("CASE_SUMMARY_CACHE_MAXSIZE", "4096")),
+    ttl=float(os.getenv("CASE_SUMMARY_CACHE_TTL", "600")),
+    name="case_summary",
+)
+CASE_SUMMARY_STAMP_SQL = "SELECT MAX(id) AS max_id FROM events WHERE chat_id = %s"
+_case_summary_lock = threading.Lock()
+
+
+def _build_case_summary(cursor, chat_id):
+    """이벤트를 최근 것부터 CASE_SUMMARY_PAGE 개씩 읽다가 글자 수가 차면 멈춘다"""
+    texts, length, last_id = [], 0, None
+    while length < CASE_SUMMARY_MAX_CHARS:
+        if last_id is None:
+            cursor.execute("""
+                SELECT id, event_text FROM events
+                WHERE chat_id = %s
+                ORDER BY id DESC LIMIT %s
+            """, (chat_id, CASE_SUMMARY_PAGE))
+        else:
+            cursor.execute("""
+                SELECT id, event_text FROM events
+                WHERE chat_id = %s AND id < %s
+                ORDER BY id DESC LIMIT %s
+            """, (chat_id, last_id, CASE_SUMMARY_PAGE))
+        rows = cursor.fetchall()
+        for row in rows:
+            if row.get("event_text"):
+                length += len(row["event_text"]) + (3 if texts else 0)  # " / "
+                texts.append(row["event_text"])
+                if length >= CASE_SUMMARY_MAX_CHARS:
+                    break
+        if len(rows) < CASE_SUMMARY_PAGE:
+            break
+        last_id = rows[-1]["id"]
+    return " / ".join(texts)[:CASE_SUMMARY_MAX_CHARS]
+
+
+def get_case_summary(chat_id):
+    cached = case_summary_cache.get(chat_id)
+    version = cached[0] if cached is not MISS else 0
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            # 스탬프와 요약을 같은 트랜잭션 스냅샷에서 읽는다 (풀이 반납 시 rollback)
+            cursor.execute(CASE_SUMMARY_STAMP_SQL, (chat_id,))
+            stamp = cursor.fetchone()["max_id"]
+            if cached is not MISS and cached[2] is not None and cached[1] == stamp:
+                return cached[2]
+            summary = _build_case_summary(cursor, chat_id)
+    with _case_summary_lock:
+        current = case_summary_cache.pop(chat_id)
+        if (current[0] if current is not MISS else 0) == version:
+            case_summary_cache.set(chat_id, (version, stamp, summary))
+        elif current is not MISS:
+            case_summary_cache.set(chat_id, current)  # 그 사이 무효화됨 → 새 버전 유지
+    return summary
+
+
+def invalidate_case_summary(chat_id):
+    """/save_event 로 이벤트가 바뀌면 호출 (같은 워커에서 진행 중이던 요약도 캐시에 남지 않게)"""
+    with _case_summary_lock:
+        current = case_summary_cache.pop(chat_id)
+        version = current[0] if current is not MISS else 0
+        case_summary_cache.set(chat_id, (version + 1, None, None))
+
+
 # 대쉬보드 (오늘의 미션, 캐릭터 정보)
+TODAY_MISSION_SQL = """
+    SELECT ums.mission_id, dm.title, ums.is_completed
+      FROM UserMissionStatus ums
+ LEFT JOIN DailyMission dm
+        ON dm.mission_id = ums.mission_id
+     WHERE ums.user_id=%s
+       AND ums.mission_date=%s
+"""
+
 def get_user_dashboard(user_id: int):
     today = datetime.now().date()
-    conn = pymysql.connect(**MYSQL_CONFIG)
-    try:
+    # 오늘의 미션 후보: 메모리의 DailyMission 목록에서 (user_id, 날짜) 해시로 고정 선택
+    picked = mission_catalog.pick(user_id, today)
+    with connection() as conn:
         with conn.cursor() as cur:
             # 1) 캐릭터 정보 조회 + 없으면 생성
             cur.execute("""
@@ -77,10 +279,11 @@ def get_user_dashboard(user_id: int):
             character = cur.fetchone()
 
             if not character:
-                # 기본 캐릭터 생성 (XP=0, LV=1, next_req=5)
+                # 기본 캐릭터 생성 (XP=0, LV=1, next_req=5). 동시에 미션 완료가 먼저 만들었으면 무시 (중복 키만)
                 cur.execute("""
                     INSERT INTO UserCharacter (user_id, total_exp, level, next_exp_req)
                     VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE user_id = user_id
                 """, (user_id, 0, 1, 5))
                 character = {
                     "user_id": user_id,
@@ -89,108 +292,81 @@ def get_user_dashboard(user_id: int):
                     "next_exp_req": 5,
                 }
 
-            # 2) 오늘 완료 처리된 미션이 있는지 먼저 체크
-            cur.execute("""
-                SELECT ums.mission_id, dm.title
-                  FROM UserMissionStatus ums
-             LEFT JOIN DailyMission dm
-                    ON dm.mission_id = ums.mission_id
-                 WHERE ums.user_id=%s
-                   AND ums.mission_date=%s
-                   AND ums.is_completed=TRUE
-            """, (user_id, today))
-            done = cur.fetchone()
-
-            if done:
+            # 2) 오늘 배정된 미션 (user_id, mission_date) UNIQUE 키로 한 행 조회
+            cur.execute(TODAY_MISSION_SQL, (user_id, today))
+            row = cur.fetchone()
+
+            if row is None and picked is not None:
+                # 3) 아직 없으면 미리 고른 미션을 오늘 미션으로 저장
+                #    동시 요청의 중복 키만 무시 (rowcount 0). INSERT IGNORE 와 달리 FK/값 오류는 그대로 올라온다
+                cur.execute("""
+                    INSERT INTO UserMissionStatus (user_id, mission_id, mission_date, is_completed)
+                    VALUES (%s, %s, %s, FALSE)
+                    ON DUPLICATE KEY UPDATE user_id = user_id
+                """, (user_id, picked[0], today))
+                if cur.rowcount:
+                    row = {"mission_id": picked[0], "title": picked[1], "is_completed": False}
+                else:
+                    cur.execute(TODAY_MISSION_SQL, (user_id, today))
+                    row = cur.fetchone()
+
+            if row:
                 today_mission = {
-                    "mission_id": done["mission_id"],
-                    "title": done["title"],
-                    "is_completed": True
+                    "mission_id": row["mission_id"],
+                    "title": row["title"],
+                    "is_completed": bool(row["is_completed"])
                 }
             else:
-                # 3) 오늘 완료되지 않은 미션 중에서 랜덤으로 하나 선택
-                cur.execute("""
-                    SELECT dm.mission_id, dm.title
-                      FROM DailyMission dm
-                 LEFT JOIN UserMissionStatus ums
-                        ON ums.mission_id = dm.mission_id
-                       AND ums.user_id = %s
-                       AND ums.mission_date = %s
-                     WHERE ums.mission_id IS NULL
-                    ORDER BY RAND()
-                    LIMIT 1
-                """, (user_id, today))
-                row = cur.fetchone()
-                if row:
-                    today_mission = {
-                        "mission_id": row["mission_id"],
-                        "title": row["title"],
-                        "is_completed": False
-                    }
-                else:
-                    today_mission = None
+                today_mission = None
 
-        # 캐릭터 최초 생성 시 INSERT 반영
+        # 캐릭터 최초 생성 / 오늘 미션 배정 INSERT 반영
         conn.commit()
         return character, today_mission
 
-    finally:
-        conn.close()
-
 
 # 미션 완료
 def complete_mission(user_id: int, mission_id: int):
+    """
+    한 트랜잭션에서 (1) 오늘 미션을 조건부 upsert 로 완료 처리하고 (2) 캐릭터 XP 를 upsert 로 올린 뒤
+    레벨업이 필요할 때만 한 번 더 UPDATE 한다.
+    동시에 여러 번 눌러도 (user_id, mission_date) UNIQUE 키와 행 잠금 때문에 XP 는 한 번만 오른다.
+    """
     today = datetime.now().date()
-    conn = pymysql.connect(**MYSQL_CONFIG)
-    try:
+    with connection() as conn:
         with conn.cursor() as cur:
-            # 날짜 기준으로 오늘 완료 여부 확인
+            # 영향받은 행 수: 1 = 새로 완료, 2 = 미완료 행을 완료로 변경, 0 = 이미 오늘 완료
+            # (pymysql 은 CLIENT_FOUND_ROWS 를 켜지 않으므로 값이 안 바뀐 행은 0 으로 센다)
             cur.execute("""
-                SELECT mission_id, is_completed
-                  FROM UserMissionStatus
-                 WHERE user_id=%s AND mission_date=%s
-                 LIMIT 1
-            """, (user_id, today))
-            row = cur.fetchone()
-
-            if row and row["is_completed"]:
-                return False, None  # 이미 오늘 완료
+                INSERT INTO UserMissionStatus (user_id, mission_id, mission_date, is_completed)
+                VALUES (%s, %s, %s, TRUE)
+                ON DUPLICATE KEY UPDATE
+                    mission_id = IF(is_completed, mission_id, VALUES(mission_id)),
+                    is_completed = TRUE
+            """, (user_id, mission_id, today))
+            if cur.rowcount == 0:
+                return False, None  # 이미 오늘 완료 (커밋 없이 반환 → 풀 반환 시 롤백)
 
-            if row:
-                cur.execute("""
-                    UPDATE UserMissionStatus
-                       SET mission_id=%s, is_completed=TRUE
-                     WHERE user_id=%s AND mission_date=%s
-                """, (mission_id, user_id, today))
-            else:
-                cur.execute("""
-                    INSERT INTO UserMissionStatus (user_id, mission_id, mission_date, is_completed)
-                    VALUES (%s, %s, %s, TRUE)
-                """, (user_id, mission_id, today))
-
-            # XP 보상 (레벨업 한 번만)
+            # XP 보상: 캐릭터가 없으면 XP 1 로 생성, 있으면 XP +1 (이 행은 커밋까지 잠김)
+            # 없는 행에 SELECT ... FOR UPDATE 를 하면 갭 잠금끼리 데드락이 날 수 있어 upsert 로 먼저 잡는다
             xp_reward = 1
+            cur.execute("""
+                INSERT INTO UserCharacter (user_id, total_exp, level, next_exp_req)
+                VALUES (%s, %s, 1, 5)
+                ON DUPLICATE KEY UPDATE total_exp = total_exp + VALUES(total_exp)
+            """, (user_id, xp_reward))
             cur.execute("""
                 SELECT total_exp, level, next_exp_req
                   FROM UserCharacter
                  WHERE user_id=%s
-                 LIMIT 1
             """, (user_id,))
             char = cur.fetchone()
-            if not char:
-                total_exp = xp_reward
-                level, next_req = 1, 5
-                cur.execute("""
-                    INSERT INTO UserCharacter (user_id, total_exp, level, next_exp_req)
-                    VALUES (%s, %s, %s, %s)
-                """, (user_id, total_exp, level, next_req))
-            else:
-                total_exp = char["total_exp"] + xp_reward
-                level, next_req = char["level"], char["next_exp_req"]
-                if total_exp >= next_req:
-                    total_exp -= next_req
-                    level += 1
-                    next_req = int(next_req * 1.2)
+            total_exp, level, next_req = char["total_exp"], char["level"], char["next_exp_req"]
+
+            # 레벨업 (한 번만)
+            if total_exp >= next_req:
+                total_exp -= next_req
+                level += 1
+                next_req = int(next_req * 1.2)
                 cur.execute("""
                     UPDATE UserCharacter
                        SET total_exp=%s, level=%s, next_exp_req=%s
@@ -204,5 +380,3 @@ def complete_mission(user_id: int, mission_id: int):
             "level": level,
             "next_exp_req": next_req
         }
-    finally:
-        conn.close()
\ No newline at end of file
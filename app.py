@@ -1,33 +1,64 @@
-from flask import Flask, request, jsonify
-import torch
-import torch.nn.functional as F
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, AutoConfig
-import joblib
-from SQL_function import save_to_db, update_emotion_summary_all, save_full_log,get_user_dashboard,complete_mission
-from model import predict_emotion
-import pymysql
-from datetime import datetime, date
+from flask import Flask, Response, request, jsonify
+import json
+import logging
+from SQL_function import save_to_db, update_emotion_summary_all, save_full_log,get_user_dashboard,complete_mission, save_predict_batch, log_buffer, \
+    get_daily_summary, get_weekly_summary, get_monthly_summary, get_range_summary, \
+    get_case_summary, invalidate_case_summary, case_summary_cache
+import model as emotion_model
+from model import predict_emotion, predict_emotions, batch_stats, cache_stats
+from datetime import datetime, date, timedelta, timezone
 from dotenv import load_dotenv
-from rag_pipeline import rag_engine
+from rag_pipeline import rag_engine, get_client, client_ready, format_context, chunk_sources, LLM_DEADLINE_S, JobQueueFull, \
+    JOB_DEADLINE_S, JOB_RUN_TIMEOUT_S, JOB_QUEUE_TIMEOUT_S
+from rag_jobs import job_store
+from rag_fallback import load_section_items
+from readiness import Registry
+from db import connection, pool_stats
+from preclassify import rules as preclassifier, forced_result
+from summary_cache import summary_cache, CLIENT_MAX_AGE as SUMMARY_CLIENT_MAX_AGE
+from mission_catalog import mission_catalog
+from llm_cache import llm_cache
 import os
+import time
+import pymysql.cursors
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 # ✅ Flask 앱 초기화
 app = Flask(__name__)
 
-# ✅ MySQL 연결
-def get_connection():
-    return pymysql.connect(
-        host="127.0.0.1",
-        user='root',
-        password='0000',
-        database='emotion_db',
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+# ✅ 무거운 리소스 로딩
+#   APP_PRELOAD=background(기본): import 직후 백그라운드 스레드에서 병렬 로드, 준비된 것부터 /readyz 에 반영
+#   APP_PRELOAD=sync           : 전부 로드될 때까지 import 를 블록
+#   APP_PRELOAD=lazy           : 첫 요청에서 로드
+#   APP_WARMUP=1(기본)         : 로드 후 더미 forward 로 워밍업
+APP_PRELOAD = os.getenv("APP_PRELOAD", "background")
+APP_WARMUP = os.getenv("APP_WARMUP", "1") == "1"
+
+# action=label 규칙의 라벨은 시작할 때 한 번 검사 → 잘못된 규칙 파일이면 요청마다 500 대신 기동 실패
+if preclassifier.label_rules():
+    preclassifier.check_labels(emotion_model.load_label_names())
+
+components = Registry()
+components.register("emotion_model", emotion_model.load, emotion_model.is_ready, warmup=emotion_model.warmup)
+components.register("rag_store", rag_engine.load_store, rag_engine.store_ready)
+components.register("rag_embedder", rag_engine.load_embedder, rag_engine.embedder_ready, warmup=rag_engine.warmup_embedder)
+components.register("openai_client", get_client, client_ready)
+if APP_PRELOAD != "lazy":
+    components.start(wait=(APP_PRELOAD == "sync"), warmup=APP_WARMUP)
 
 # ----------------------------------------------------------
 # 발화에 따른 감정 누적
 # ----------------------------------------------------------
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "500"))
+
+
+def forced_emotion(rule):
+    """action=label 규칙이면 모델 없이 만든 결과, 아니면 None"""
+    if rule is None or rule.action != "label":
+        return None
+    emotion_model.load()
+    return forced_result(rule.label, emotion_model.label_names)
+
 @app.route("/predict", methods=["POST"])
 def predict():
     data = request.get_json()
@@ -40,18 +71,18 @@ def predict():
     if not all([gpt_text, chat_id]):
         return jsonify({"error": "chat_id, gpt_text 모두 필요합니다."}), 400
 
-    # 단어 거르기
-    NEUTRAL_KEYWORDS = {"고마워", "감사", "안녕", "ㅋㅋ", "ㅎㅎ", "웅", "응", "헉", "헐", "오", "와"}
-    if any(word in user_text for word in NEUTRAL_KEYWORDS):
+    # 단어 거르기 (preclassify_rules.json 규칙)
+    rule = preclassifier.match(user_text)
+    if rule is not None and rule.action == "skip":
         save_full_log(chat_id, user_text, gpt_text, today)
         return jsonify({
             "message": "저장하지 않았습니다.",
             "result": {}
         })
 
-    result = {}
-    if user_text.strip():  # user_text 있을 때만 감정 분석
-        result = predict_emotion(user_text)
+    result = forced_emotion(rule) or {}
+    if result or user_text.strip():  # user_text 있을 때만 감정 분석
+        result = result or predict_emotion(user_text)
         top_emotion = max(result, key=result.get)
         confidence = result[top_emotion]
 
@@ -76,6 +107,67 @@ def predict():
         "result": result
     })
 
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    입력 JSON: {"items": [{"chat_id": 1, "user_text": "...", "gpt_text": "..."}, ...]}
+      - 항목마다 /predict 와 같은 규칙(사전 분류 규칙, 중립 50% 이상) 적용
+      - 감정 분석은 배치 forward, DB 저장은 한 트랜잭션
+      - results 는 입력 순서 그대로 반환
+    """
+    data = request.get_json() or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items 리스트가 필요합니다."}), 400
+    if len(items) > PREDICT_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"items는 최대 {PREDICT_BATCH_MAX_ITEMS}개까지 가능합니다."}), 400
+
+    invalid = [i for i, it in enumerate(items)
+               if not isinstance(it, dict) or not all([it.get("gpt_text"), it.get("chat_id")])]
+    if invalid:
+        return jsonify({"error": "chat_id, gpt_text 모두 필요합니다.", "invalid_indices": invalid}), 400
+
+    today = datetime.now().date()
+    texts = [it.get("user_text") or "" for it in items]
+    matched = [preclassifier.match(t) for t in texts]
+    skipped = {i for i, r in enumerate(matched) if r is not None and r.action == "skip"}
+    predictions = {i: forced_emotion(r) for i, r in enumerate(matched) if r is not None and r.action == "label"}
+    targets = [i for i, t in enumerate(texts) if i not in skipped and i not in predictions and t.strip()]
+    predictions.update(zip(targets, predict_emotions([texts[i] for i in targets])))
+
+    results, emotion_rows, prob_dicts, log_rows = [], [], [], []
+    for i, item in enumerate(items):
+        user_text = texts[i]
+        # 전체 대화 로그는 항목마다 저장
+        log_rows.append((item["chat_id"], today, user_text, item["gpt_text"]))
+
+        if i in skipped:
+            results.append({"message": "저장하지 않았습니다.", "result": {}})
+            continue
+
+        result = predictions.get(i, {})
+        if not result:
+            results.append({"message": "user_text 없음, 전체 로그만 저장됨", "result": {}})
+            continue
+
+        top_emotion = max(result, key=result.get)
+        emotion_rows.append((user_text, top_emotion, result[top_emotion]))
+
+        # 중립 50% 이상 필터링
+        if "중립" in result and result["중립"] >= 50.0:
+            results.append({"message": "중립 감정이 50% 이상이라 저장하지 않았습니다.", "result": result})
+            continue
+
+        prob_dicts.append(result)
+        results.append({"message": "감정 분석 완료 및 저장됨", "result": result})
+
+    try:
+        save_predict_batch(emotion_rows, prob_dicts, log_rows)
+    except Exception as e:
+        return jsonify({"error": f"저장 실패: {e}"}), 500
+
+    return jsonify({"results": results}), 200
+
 # ----------------------------------------------------------
 # 이벤트 저장 / 반환
 # ----------------------------------------------------------
@@ -91,17 +183,18 @@ def save_event():
         return jsonify({'success': False, 'message': 'chat_id, event_text, event_type는 모두 필요합니다.'}), 400
 
     try:
-        connection = get_connection()
-        with connection.cursor() as cursor:
-            query = """
-                INSERT INTO events (chat_id, event_text, event_type)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    event_text = VALUES(event_text),
-                    event_type = VALUES(event_type)
-            """
-            cursor.execute(query, (chat_id, event_text, event_type))
-            connection.commit()
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                query = """
+                    INSERT INTO events (chat_id, event_text, event_type)
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        event_text = VALUES(event_text),
+                        event_type = VALUES(event_type)
+                """
+                cursor.execute(query, (chat_id, event_text, event_type))
+                conn.commit()
+        invalidate_case_summary(chat_id)
 
         return jsonify({'success': True, 'message': '이벤트가 저장(또는 업데이트)되었습니다.'}), 201
 
@@ -111,25 +204,15 @@ def save_event():
 @app.route('/get_events/<int:chat_id>', methods=['GET'])
 def get_events(chat_id):
     try:
-        connection = pymysql.connect(
-            host="127.0.0.1",
-            user='root',
-            password='0000',
-            database='emotion_db',
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-
-        with connection.cursor() as cursor:
-            query = """
-                SELECT event_text, event_type
-                FROM events
-                WHERE chat_id = %s
-            """
-            cursor.execute(query, (chat_id,))
-            rows = cursor.fetchall()
-
-        connection.close()
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                query = """
+                    SELECT event_text, event_type
+                    FROM events
+                    WHERE chat_id = %s
+                """
+                cursor.execute(query, (chat_id,))
+                rows = cursor.fetchall()
 
         return jsonify({
             'success': True,
@@ -144,25 +227,51 @@ def get_events(chat_id):
 # 누적 감정 일별 / 월별 / 주별 제공
 # ----------------------------------------------------------       
 
+def parse_day(value):
+    """'YYYY-MM-DD' → date (형식이 틀리면 ValueError)"""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_month(value):
+    """'YYYY-MM' → 그 달 1일"""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def parse_iso_week(value):
+    """'YYYY-Www' (예: 2025-W07) → 그 주 월요일"""
+    year, sep, week = value.partition("-W")
+    if not sep or not year.isdigit() or not week.isdigit():
+        raise ValueError(value)
+    return date.fromisocalendar(int(year), int(week), 1)
+
+
+def summary_response(entry, payload):
+    """캐시 항목의 ETag / Last-Modified 를 붙이고, 조건부 요청이면 304 로 응답"""
+    resp = jsonify(payload)
+    resp.set_etag(entry.etag)
+    resp.last_modified = entry.last_modified.astimezone(timezone.utc)
+    if entry.closed:
+        resp.cache_control.max_age = SUMMARY_CLIENT_MAX_AGE
+    else:
+        resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+
 @app.route('/summary/daily/<date>', methods=['GET'])
 def summary_daily(date):
     try:
-        connection = get_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT 
-                    emotion,
-                    ROUND(total_confidence / count, 2) AS avg_percent
-                FROM emotion_summary
-                WHERE date = %s
-            """
-            cursor.execute(query, (date,))
-            rows = cursor.fetchall()
+        day = parse_day(date)
+    except ValueError:
+        return jsonify({'success': False, 'message': '날짜 형식은 YYYY-MM-DD 입니다.'}), 400
+
+    try:
+        entry = summary_cache.get_or_load(
+            "daily", day, day + timedelta(days=1), lambda: get_daily_summary(day))
 
-        if not rows:
+        if not entry.rows:
             return jsonify({'success': False, 'message': f'{date}의 데이터가 없습니다.'}), 404
 
-        return jsonify({'success': True, 'date': date, 'data': rows}), 200
+        return summary_response(entry, {'success': True, 'date': date, 'data': entry.rows})
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -171,97 +280,221 @@ def summary_daily(date):
 @app.route('/summary/monthly/<month>', methods=['GET'])
 def summary_monthly(month):
     try:
-        connection = get_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT 
-                    emotion,
-                    ROUND(SUM(total_confidence) / SUM(count), 2) AS avg_percent
-                FROM emotion_summary
-                WHERE DATE_FORMAT(date, '%%Y-%%m') = %s
-                GROUP BY emotion
-            """
-            cursor.execute(query, (month,))
-            rows = cursor.fetchall()
+        first = parse_month(month)
+    except ValueError:
+        return jsonify({'success': False, 'message': '월 형식은 YYYY-MM 입니다.'}), 400
+
+    try:
+        # ✅ emotion_summary_monthly 롤업에서 한 달치(감정 수만큼)만 읽음
+        next_first = (first + timedelta(days=32)).replace(day=1)
+        entry = summary_cache.get_or_load(
+            "monthly", first, next_first, lambda: get_monthly_summary(first))
 
-        if not rows:
+        if not entry.rows:
             return jsonify({'success': False, 'message': f'{month}의 데이터가 없습니다.'}), 404
 
-        return jsonify({'success': True, 'month': month, 'data': rows}), 200
+        return summary_response(entry, {'success': True, 'month': month, 'data': entry.rows})
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/summary/week/<week>', methods=['GET'])
+def summary_week(week):
+    try:
+        week_start = parse_iso_week(week)
+    except ValueError:
+        return jsonify({'success': False, 'message': '주 형식은 YYYY-Www (ISO 주, 예: 2025-W07) 입니다.'}), 400
+
+    try:
+        # ✅ emotion_summary_weekly 롤업에서 한 주치(감정 수만큼)만 읽음
+        entry = summary_cache.get_or_load(
+            "week", week_start, week_start + timedelta(days=7), lambda: get_weekly_summary(week_start))
+
+        if not entry.rows:
+            return jsonify({'success': False, 'message': f'{week}의 데이터가 없습니다.'}), 404
+
+        return summary_response(entry, {
+            'success': True,
+            'week': week,
+            'range': {
+                'start_date': week_start.strftime('%Y-%m-%d'),
+                'end_date': (week_start + timedelta(days=6)).strftime('%Y-%m-%d')
+            },
+            'data': entry.rows
+        })
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def load_range_summary(start, end_exclusive):
+    rows = get_range_summary(start, end_exclusive)
+    # ✅ 날짜 포맷 변환 (캐시에 넣기 전에)
+    for row in rows:
+        if isinstance(row['date'], (datetime, date)):
+            row['date'] = row['date'].strftime('%Y-%m-%d')
+    return rows
+
 @app.route('/summary/weekly/<start_date>/<end_date>', methods=['GET'])
 def summary_weekly(start_date, end_date):
     if not start_date or not end_date:
         return jsonify({'success': False, 'message': '시작일과 종료일이 모두 필요합니다.'}), 400
+    try:
+        start, end = parse_day(start_date), parse_day(end_date)
+    except ValueError:
+        return jsonify({'success': False, 'message': '날짜 형식은 YYYY-MM-DD 입니다.'}), 400
 
     try:
-        connection = get_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT 
-                    date,
-                    emotion,
-                    ROUND(total_confidence / count, 2) AS avg_percent
-                FROM emotion_summary
-                WHERE date BETWEEN %s AND %s
-                ORDER BY date, emotion
-            """
-            cursor.execute(query, (start_date, end_date))
-            rows = cursor.fetchall()
+        # 종료일 포함 → [start, end + 1일)
+        end_exclusive = end + timedelta(days=1)
+        entry = summary_cache.get_or_load(
+            "range", start, end_exclusive, lambda: load_range_summary(start, end_exclusive))
 
-        if not rows:
+        if not entry.rows:
             return jsonify({
                 'success': False,
                 'message': f'{start_date}부터 {end_date}까지의 데이터가 없습니다.'
             }), 404
 
-        # ✅ 날짜 포맷 변환
-        for row in rows:
-            if isinstance(row['date'], (datetime, date)):
-                row['date'] = row['date'].strftime('%Y-%m-%d')
-
-        return jsonify({
+        return summary_response(entry, {
             'success': True,
             'range': {
                 'start_date': start_date,
                 'end_date': end_date
             },
-            'data': rows
-        }), 200
+            'data': entry.rows
+        })
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 # ----------------------------------------------------------
 # 대화 내역 불러오기
 # ----------------------------------------------------------     
+#   (기본)               : 전체 대화를 한 번에 (기존 동작)
+#   ?after_id=&limit=    : (date, id) 순 keyset 페이지. 응답의 next_after_id 를 다음 after_id 로
+#   ?stream=1            : 서버 측 커서로 읽으면서 JSON 을 조금씩 내보냄 (대화 길이와 무관하게 메모리 일정)
+CONVERSATIONS_PAGE_DEFAULT = int(os.getenv("CONVERSATIONS_PAGE_DEFAULT", "50"))
+CONVERSATIONS_PAGE_MAX = int(os.getenv("CONVERSATIONS_PAGE_MAX", "500"))
+CONVERSATIONS_STREAM_CHUNK = 200
+
+
+def conversation_messages(row):
+    return [
+        {"role": "user", "content": row["user_text"]},
+        {"role": "gpt", "content": row["gpt_text"]},
+    ]
+
+
+def conversations_page(chat_id, after_id, limit):
+    """after_id 다음부터 limit 행 → (메시지 목록, next_after_id 또는 None)"""
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            if after_id is None:
+                cursor.execute("""
+                    SELECT id, user_text, gpt_text
+                    FROM conversation_log
+                    WHERE chat_id = %s
+                    ORDER BY date ASC, id ASC
+                    LIMIT %s
+                """, (chat_id, limit + 1))
+            else:
+                # 정렬 키가 (date, id) 이므로 after_id 행의 date 를 먼저 찾아 그 뒤부터 읽는다
+                cursor.execute("""
+                    SELECT date FROM conversation_log WHERE id = %s AND chat_id = %s
+                """, (after_id, chat_id))
+                anchor = cursor.fetchone()
+                if anchor is None:
+                    raise LookupError(f"after_id {after_id} 는 chat_id {chat_id} 의 대화가 아닙니다.")
+                cursor.execute("""
+                    SELECT id, user_text, gpt_text
+                    FROM conversation_log
+                    WHERE chat_id = %s
+                      AND (date > %s OR (date = %s AND id > %s))
+                    ORDER BY date ASC, id ASC
+                    LIMIT %s
+                """, (chat_id, anchor["date"], anchor["date"], after_id, limit + 1))
+            rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    messages = [m for row in rows for m in conversation_messages(row)]
+    return messages, (rows[-1]["id"] if has_more else None)
+
+
+def stream_conversations(chat_id):
+    """
+    SSDictCursor 로 행을 받는 대로 JSON 조각을 내보낸다.
+    중간에 실패하면 이미 보낸 목록을 닫고 success=false 와 error 로 끝낸다.
+    커넥션은 응답이 끝날 때까지 풀에서 빌린 상태로 유지된다.
+    """
+    yield '{"conversations": ['
+    first = True
+    try:
+        with connection() as conn:
+            with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT user_text, gpt_text
+                    FROM conversation_log
+                    WHERE chat_id = %s
+                    ORDER BY date ASC, id ASC
+                """, (chat_id,))
+                while True:
+                    rows = cursor.fetchmany(CONVERSATIONS_STREAM_CHUNK)
+                    if not rows:
+                        break
+                    parts = []
+                    for row in rows:
+                        for message in conversation_messages(row):
+                            parts.append(("" if first else ",") + json.dumps(message))
+                            first = False
+                    yield "".join(parts)
+        yield '], "success": true}'
+    except Exception as e:
+        logging.getLogger(__name__).exception("대화 스트리밍 실패 (chat_id=%s)", chat_id)
+        yield '], "success": false, "error": ' + json.dumps(str(e)) + "}"
+
+
 @app.route("/get_conversations/<chat_id>", methods=["GET"])
 def get_conversations(chat_id):
+    if request.args.get("stream") == "1":
+        return Response(stream_conversations(chat_id), mimetype="application/json")
+
+    if "after_id" in request.args or "limit" in request.args:
+        # type=int 는 잘못된 값을 조용히 None 으로 바꿔 첫 페이지를 다시 주므로 직접 파싱
+        try:
+            after_id = request.args.get("after_id") or None
+            after_id = int(after_id) if after_id is not None else None
+            limit = int(request.args.get("limit") or CONVERSATIONS_PAGE_DEFAULT)
+        except ValueError:
+            return jsonify({"success": False, "error": "after_id, limit 는 정수여야 합니다."}), 400
+        limit = max(1, min(limit, CONVERSATIONS_PAGE_MAX))
+
+        try:
+            conversations, next_after_id = conversations_page(chat_id, after_id, limit)
+        except LookupError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+
+        return jsonify({
+            "success": True,
+            "conversations": conversations,
+            "next_after_id": next_after_id,
+            "has_more": next_after_id is not None
+        })
+
     try:
-        connection = get_connection()
-        with connection.cursor() as cursor:
-            query = """
-                SELECT date, user_text, gpt_text
-                FROM conversation_log
-                WHERE chat_id = %s
-                ORDER BY date ASC, id ASC
-            """
-            cursor.execute(query, (chat_id,))
-            rows = cursor.fetchall()
-        connection.close()
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                query = """
+                    SELECT user_text, gpt_text
+                    FROM conversation_log
+                    WHERE chat_id = %s
+                    ORDER BY date ASC, id ASC
+                """
+                cursor.execute(query, (chat_id,))
+                rows = cursor.fetchall()
 
-        conversations = []
-        for row in rows:
-            conversations.append({
-                "role": "user",
-                "content": row["user_text"]
-            })
-            conversations.append({
-                "role": "gpt",
-                "content": row["gpt_text"]
-            })
+        conversations = [m for row in rows for m in conversation_messages(row)]
 
         return jsonify({
             "success": True,
@@ -280,18 +513,16 @@ def get_conversations(chat_id):
 @app.route("/latest_chat_id", methods=["GET"])
 def get_latest_chat_id():
     try:
-        connection = get_connection()
-
-        with connection.cursor() as cursor:
-            query = """
-                SELECT chat_id
-                FROM events
-                ORDER BY id DESC
-                LIMIT 1
-            """
-            cursor.execute(query)
-            row = cursor.fetchone()
-        connection.close()
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                query = """
+                    SELECT chat_id
+                    FROM events
+                    ORDER BY id DESC
+                    LIMIT 1
+                """
+                cursor.execute(query)
+                row = cursor.fetchone()
 
         if row:
             return jsonify({
@@ -353,19 +584,54 @@ def mission_complete(user_id, mission_id):
     }), 200
     
 # ----------------------------------------------------------
-# rag
-# ----------------------------------------------------------  
+# 헬스 체크 / 준비 상태
+# ----------------------------------------------------------
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # 프로세스가 요청을 받을 수 있으면 200
+    return jsonify({"status": "ok"}), 200
+
 
-def load_section_items(category: str, section: str) -> list[str]:
-    """rag_data/{category}_{section}.txt 를 라인 단위 체크 항목으로 변환"""
-    path = os.path.join("rag_data", f"{category}_{section}.txt")
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        lines = [ln.strip("-·• ").strip() for ln in f.read().splitlines()]
-    # 빈 줄 제거
-    return [ln for ln in lines if ln]
+@app.route("/readyz", methods=["GET"])
+@app.route("/readyz/<component>", methods=["GET"])
+def readyz(component=None):
+    """
+    /readyz            : 모든 컴포넌트가 준비되면 200, 아니면 503
+    /readyz/<component>: 해당 컴포넌트만 확인 (emotion_model, rag_store, rag_embedder, openai_client)
+    """
+    if component and component not in components:
+        return jsonify({"ready": False, "message": f"알 수 없는 컴포넌트: {component}"}), 404
 
+    names = [component] if component else None
+    ready = components.ready(names)
+    status = components.status()
+    if component:
+        status = {component: status[component]}
+    return jsonify({"ready": ready, "components": status}), 200 if ready else 503
+
+# ----------------------------------------------------------
+# 운영 지표
+# ----------------------------------------------------------
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "emotion_batcher": batch_stats(),
+        "emotion_cache": cache_stats(),
+        "preclassify": preclassifier.stats(),
+        "db_pool": pool_stats(),
+        "write_behind": log_buffer.stats(),
+        "summary_cache": summary_cache.stats(),
+        "mission_catalog": mission_catalog.stats(),
+        "case_summary_cache": case_summary_cache.stats(),
+        "rag_embedding": rag_engine.embedding_stats(),
+        "rag_llm_cache": llm_cache.stats(),
+        "rag_answers": rag_engine.answer_stats(),
+        "rag_singleflight": rag_engine.singleflight_stats(),
+    }), 200
+
+# ----------------------------------------------------------
+# rag
+# ----------------------------------------------------------  
 
 @app.route("/advice/options", methods=["GET"])
 def advice_options():
@@ -381,55 +647,164 @@ def advice_options():
     }
     return jsonify({"success": True, "data": data}), 200
 
-@app.route("/rag/advise", methods=["POST"])
-def rag_advise():
+def advise_request(data, budget=LLM_DEADLINE_S):
     """
-    입력 JSON:
-    {
-      "category": "보이스피싱",
-      "user_text": "선택. 사용자가 서술한 경험",
-      "chat_id": 123,   // 선택. 주어지면 events에서 event_text를 모아 요약으로 사용
-      "section": "대처방안"  // 선택: 기본값 대처방안
-    }
+    /rag/advise 공통 입력 처리 → ((category, section, case_summary, budget), None) 또는 (None, 에러 응답)
+    budget: 지연 예산(초). deadline_ms 로 더 짧게 줄 수 있음 (기본 RAG_LLM_DEADLINE_S, 작업은 RAG_JOB_DEADLINE_S)
     """
-    data = request.get_json() or {}
+    if data.get("deadline_ms"):
+        try:
+            budget = min(budget, max(0.1, float(data["deadline_ms"]) / 1000))
+        except (TypeError, ValueError):
+            return None, (jsonify({"success": False, "message": "deadline_ms는 숫자여야 합니다."}), 400)
+
     category = (data.get("category") or "").strip()
     section  = (data.get("section") or "대처방안").strip()
     user_text = (data.get("user_text") or "").strip()
     chat_id   = data.get("chat_id")
 
     if not category:
-        return jsonify({"success": False, "message": "category는 필수입니다."}), 400
+        return None, (jsonify({"success": False, "message": "category는 필수입니다."}), 400)
+
+    if (not user_text) and chat_id:
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            return None, (jsonify({"success": False, "message": "chat_id는 정수여야 합니다."}), 400)
 
     # case_summary 만들기
     case_summary = user_text
     if (not case_summary) and chat_id:
         try:
-            connection = get_connection()
-            with connection.cursor() as cursor:
-                # 최근 것부터 모아 간단히 합침(원하면 limit/timestamp 조절)
-                cursor.execute("""
-                    SELECT event_text
-                    FROM events
-                    WHERE chat_id = %s
-                    ORDER BY id DESC
-                """, (chat_id,))
-                rows = cursor.fetchall()
-            connection.close()
-            case_summary = " / ".join([r["event_text"] for r in rows if r.get("event_text")])[:2000]
+            # 최근 이벤트부터 2000자까지 (chat 별 캐시, 이벤트 수/최대 id 로 검증)
+            case_summary = get_case_summary(chat_id)
         except Exception as e:
-            return jsonify({"success": False, "message": f"이벤트 로딩 실패: {e}"}), 500
+            return None, (jsonify({"success": False, "message": f"이벤트 로딩 실패: {e}"}), 500)
 
     if not case_summary:
-        return jsonify({"success": False, "message": "user_text 또는 chat_id로부터 요약이 필요합니다."}), 400
+        return None, (jsonify({"success": False, "message": "user_text 또는 chat_id로부터 요약이 필요합니다."}), 400)
+
+    return (category, section, case_summary, budget), None
+
+
+@app.route("/rag/advise", methods=["POST"])
+def rag_advise():
+    """
+    입력 JSON:
+    {
+      "category": "보이스피싱",
+      "user_text": "선택. 사용자가 서술한 경험",
+      "chat_id": 123,   // 선택. 주어지면 events에서 event_text를 모아 요약으로 사용
+      "section": "대처방안",  // 선택: 기본값 대처방안
+      "deadline_ms": 5000    // 선택: 지연 예산 (RAG_LLM_DEADLINE_S 보다 짧게만)
+    }
+    LLM 이 예산 안에 답하지 못하면 rag_data 기반 추출식 답변을 "_degraded": true 로 반환
+    """
+    arrived = time.monotonic()  # 예산은 요청 도착부터 (이벤트 로딩 포함)
+    inputs, error = advise_request(request.get_json() or {})
+    if error:
+        return error
+    category, section, case_summary, budget = inputs
+    deadline = arrived + budget
 
     try:
         # 섹션 필터를 달고 검색 정밀도 ↑
-        context = rag_engine.retrieve(query=case_summary, category=category, section=section, top_k=5)
-        result  = rag_engine.generate_json(case_summary=case_summary, category=category, context=context, section=section)
+        result = rag_engine.advise(case_summary=case_summary, category=category, section=section, deadline=deadline)
         return jsonify({"success": True, "data": result}), 200
     except Exception as e:
         return jsonify({"success": False, "message": f"RAG 생성 실패: {e}"}), 500
 
+
+@app.route("/rag/advise/jobs", methods=["POST"])
+def rag_advise_job():
+    """
+    /rag/advise 비동기 버전 (입력 JSON 동일). 요청 스레드는 바로 202 를 돌려주고
+    검색 + 생성은 RAG 작업 스레드 풀에서 진행 → GET /rag/advise/jobs/<job_id> 로 결과 조회
+    """
+    inputs, error = advise_request(request.get_json() or {}, budget=JOB_DEADLINE_S)
+    if error:
+        return error
+    category, section, case_summary, budget = inputs
+
+    job_id = job_store.create()
+    try:
+        # 예산은 작업이 실행을 시작할 때부터 (큐 대기 시간 제외)
+        future = rag_engine.submit_advise(case_summary=case_summary, category=category, section=section,
+                                          budget=budget, on_start=lambda: job_store.start(job_id))
+    except JobQueueFull as e:
+        job_store.fail(job_id, str(e))
+        return jsonify({"success": False, "message": str(e)}), 503
+
+    def store_result(f):
+        try:
+            job_store.finish(job_id, f.result())
+        except Exception as e:
+            job_store.fail(job_id, f"RAG 생성 실패: {e}")
+
+    future.add_done_callback(store_result)
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status_url": f"/rag/advise/jobs/{job_id}"
+    }), 202
+
+
+@app.route("/rag/advise/jobs/<job_id>", methods=["GET"])
+def rag_advise_job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    if job["status"] == "pending" and job_store.abandon_stale(
+            job_id, JOB_RUN_TIMEOUT_S, JOB_QUEUE_TIMEOUT_S, "작업을 처리하던 워커가 종료되어 결과가 없습니다."):
+        job = job_store.get(job_id)
+    if job["status"] == "pending":
+        return jsonify({"success": True, "status": "pending"}), 200
+    if job["status"] == "error":
+        return jsonify({"success": False, "status": "error", "message": job["error"]}), 200
+    return jsonify({"success": True, "status": "done", "data": job["result"]}), 200
+
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.route("/rag/advise/stream", methods=["POST"])
+def rag_advise_stream():
+    """
+    /rag/advise 의 Server-Sent Events 버전 (입력 JSON 동일)
+      event: context → {"context": 프롬프트에 들어간 근거, "sources": [{source, section, text}, ...]}  (검색 직후)
+      event: token   → {"delta": 모델 출력 조각}  (생성되는 대로)
+      event: result  → {"success": true, "data": /rag/advise 와 같은 JSON}
+      event: error   → {"success": false, "message": ...}
+    """
+    arrived = time.monotonic()
+    inputs, error = advise_request(request.get_json() or {})
+    if error:
+        return error
+    category, section, case_summary, budget = inputs
+    deadline = arrived + budget
+
+    def events():
+        try:
+            chunks  = rag_engine.retrieve_case(case_summary, category, section)
+            context = format_context(chunks)
+            yield sse("context", {"context": context, "sources": chunk_sources(chunks)})
+
+            for kind, value in rag_engine.generate_stream(
+                    case_summary=case_summary, category=category, context=context, section=section,
+                    deadline=deadline, chunks=chunks):
+                if kind == "token":
+                    yield sse("token", {"delta": value})
+                else:
+                    yield sse("result", {"success": True, "data": value})
+        except Exception as e:
+            logging.getLogger(__name__).exception("RAG 스트리밍 실패")
+            yield sse("error", {"success": False, "message": f"RAG 생성 실패: {e}"})
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx 프록시 버퍼링 끄기
+    })
+
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
@@ -0,0 +1,123 @@
+# batching.py
+# 동시 요청을 모아 한 번의 배치 연산으로 처리하는 마이크로 배처
+import threading
+import time
+import queue
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    submit()으로 들어온 항목을 큐에 모았다가
+      - 배치가 max_batch_size 만큼 차거나
+      - 첫 항목 도착 후 max_wait_ms 가 지나면
+    batch_fn(list) 을 한 번 호출하고, 결과를 각 호출자에게 순서대로 돌려준다.
+    batch_fn 은 입력과 같은 길이/순서의 리스트를 반환해야 한다.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 name: str = "batcher", latency_window: int = 2048):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # 통계
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._latencies = deque(maxlen=latency_window)  # 요청별 대기+연산 시간(초)
+
+    # ------------------------------------------------------
+    # 호출자 측
+    # ------------------------------------------------------
+    def submit(self, item) -> Future:
+        self._ensure_worker()
+        fut = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut
+
+    def __call__(self, item, timeout: float = None):
+        return self.submit(item).result(timeout=timeout)
+
+    # ------------------------------------------------------
+    # 워커 측
+    # ------------------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-worker", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [b[0] for b in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn 결과 개수({len(results)})가 입력({len(items)})과 다릅니다."
+                    )
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            with self._lock:
+                self._batches += 1
+                self._items += len(items)
+                for _, _, t0 in batch:
+                    self._latencies.append(now - t0)
+            for (_, fut, _), res in zip(batch, results):
+                fut.set_result(res)
+
+    # ------------------------------------------------------
+    # 지표
+    # ------------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+            batches, items, errors = self._batches, self._items, self._errors
+
+        def pct(p):
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2)
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "errors": errors,
+            "avg_batch_size": round(items / batches, 2) if batches else None,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        }
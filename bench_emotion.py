@@ -0,0 +1,130 @@
+# bench_emotion.py
+# 감정 분류 추론 벤치마크
+#
+# 1) padding: 입력 길이별 요청당 CPU 시간 비교
+#      before: ElectraTokenizer(파이썬) + padding="max_length"(128)
+#      after : ElectraTokenizerFast(Rust) + 최장 길이 패딩
+#    python bench_emotion.py padding --lengths 8,16,32,64,128 --repeat 30
+#
+# 2) throughput: 백엔드별 배치 크기에 따른 지연/처리량
+#    python bench_emotion.py throughput --backends torch,onnx --batch-sizes 1,8,16 --seconds 10
+import argparse
+import glob
+import time
+
+import numpy as np
+import torch
+from transformers import ElectraTokenizer
+
+import model as emotion_model
+
+
+def load_words():
+    words = []
+    for fp in sorted(glob.glob("rag_data/*.txt")):
+        with open(fp, "r", encoding="utf-8") as f:
+            words.extend(f.read().split())
+    return words
+
+
+def make_sentences(tok, lengths):
+    """rag_data 본문을 잘라 목표 토큰 길이에 맞는 문장 생성"""
+    words = load_words()
+    out = {}
+    for target in lengths:
+        picked = []
+        for w in words:
+            picked.append(w)
+            # [CLS], [SEP] 포함 길이
+            if len(tok(" ".join(picked))["input_ids"]) >= target:
+                break
+        out[target] = " ".join(picked)
+    return out
+
+
+def cpu_time_per_request(fn, text, repeat):
+    fn(text)  # 워밍업
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn(text)
+    return (time.process_time() - t0) / repeat * 1000
+
+
+def bench_padding(args):
+    lengths = [int(x) for x in args.lengths.split(",")]
+    emotion_model.load()
+    slow_tok = ElectraTokenizer.from_pretrained(emotion_model.MODEL_PATH, local_files_only=True)
+    torch_backend = emotion_model.TorchBackend()
+
+    def before(text):
+        inputs = slow_tok(text, return_tensors="pt", truncation=True,
+                          padding="max_length", max_length=emotion_model.MAX_LENGTH).to(emotion_model.DEVICE)
+        with torch.no_grad():
+            torch_backend.model(**inputs)
+
+    def after(text):
+        emotion_model.predict_probs([text], using=torch_backend)
+
+    sentences = make_sentences(emotion_model.tokenizer, lengths)
+    print(f"device={emotion_model.DEVICE} torch_threads={torch.get_num_threads()} repeat={args.repeat}")
+    print(f"{'tokens':>8} {'before(ms)':>12} {'after(ms)':>12} {'speedup':>9}")
+    for text in sentences.values():
+        n_tok = len(emotion_model.tokenizer(text, truncation=True, max_length=emotion_model.MAX_LENGTH)["input_ids"])
+        b = cpu_time_per_request(before, text, args.repeat)
+        a = cpu_time_per_request(after, text, args.repeat)
+        print(f"{n_tok:>8} {b:>12.2f} {a:>12.2f} {b / a:>8.2f}x")
+
+
+def bench_throughput(args):
+    # 채팅 발화 길이를 흉내 내도록 3~20 단어 문장을 섞어 사용
+    rng = np.random.default_rng(0)
+    words = load_words()
+    pool = []
+    for _ in range(256):
+        n = int(rng.integers(3, 21))
+        start = int(rng.integers(0, max(1, len(words) - n)))
+        pool.append(" ".join(words[start:start + n]))
+
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    emotion_model.load()
+    print(f"{'backend':>8} {'batch':>6} {'p50(ms)':>9} {'p99(ms)':>9} {'sent/s':>9}")
+    for name in args.backends.split(","):
+        be = emotion_model.load_backend(name)
+        for bs in batch_sizes:
+            batch = pool[:bs]
+            emotion_model.predict_probs(batch, using=be)  # 워밍업
+            lat, done, i = [], 0, 0
+            t_end = time.perf_counter() + args.seconds
+            while time.perf_counter() < t_end:
+                batch = [pool[(i + k) % len(pool)] for k in range(bs)]
+                i += bs
+                t0 = time.perf_counter()
+                emotion_model.predict_probs(batch, using=be)
+                lat.append(time.perf_counter() - t0)
+                done += bs
+            lat_ms = np.array(lat) * 1000
+            print(f"{name:>8} {bs:>6} {np.percentile(lat_ms, 50):>9.2f} {np.percentile(lat_ms, 99):>9.2f} "
+                  f"{done / sum(lat):>9.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("padding")
+    p.add_argument("--lengths", default="8,16,32,64,128")
+    p.add_argument("--repeat", type=int, default=30)
+    p.set_defaults(func=bench_padding)
+
+    t = sub.add_parser("throughput")
+    t.add_argument("--backends", default="torch,onnx")
+    t.add_argument("--batch-sizes", default="1,8,16")
+    t.add_argument("--seconds", type=float, default=10)
+    t.set_defaults(func=bench_throughput)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_rag_concurrency.py
+# /rag/advise 요청이 많이 걸려 있는 동안 다른 엔드포인트가 계속 응답하는지 측정
+# 사용법 (목 서버 + 앱 실행 후):
+#   python mock_openai_server.py --delay 3 &
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock gunicorn -c gunicorn.conf.py app:app &
+#   python bench_rag_concurrency.py --url http://127.0.0.1:8000 --advice 64 --mode jobs
+#
+#   --mode jobs : POST /rag/advise/jobs 후 상태 폴링 (요청 스레드를 붙잡지 않음)
+#   --mode sync : POST /rag/advise (비교용)
+# 같은 시간 동안 --probe 경로를 계속 호출해 지연 p50/p95/max 를 출력한다.
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CATEGORIES = ["보이스피싱", "전세사기", "중고거래사기", "소비중독", "주식투자실패"]
+
+
+def http(method, url, body=None, timeout=120):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 1) if values else None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--advice", type=int, default=64, help="동시에 보낼 조언 요청 수")
+    ap.add_argument("--mode", choices=["jobs", "sync"], default="jobs")
+    ap.add_argument("--probe", default="/api/users/1/dashboard", help="응답성 확인용 경로")
+    ap.add_argument("--poll", type=float, default=0.2)
+    args = ap.parse_args()
+
+    done = threading.Event()
+    probe_lat = []
+
+    def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            try:
+                http("GET", args.url + args.probe, timeout=30)
+                probe_lat.append(time.perf_counter() - t0)
+            except Exception:
+                pass
+            time.sleep(0.05)
+
+    def advice(i):
+        body = {
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "user_text": f"벤치마크 사례 {i}: 모르는 번호로 송금을 요구받았습니다.",
+        }
+        t0 = time.perf_counter()
+        if args.mode == "sync":
+            status, payload = http("POST", args.url + "/rag/advise", body)
+            return time.perf_counter() - t0, status, (payload.get("data") or {}).get("_degraded", False)
+        status, payload = http("POST", args.url + "/rag/advise/jobs", body)
+        if status != 202:
+            return time.perf_counter() - t0, status, False
+        while True:
+            time.sleep(args.poll)
+            _, job = http("GET", args.url + payload["status_url"])
+            if job.get("status") != "pending":
+                return time.perf_counter() - t0, job.get("status"), (job.get("data") or {}).get("_degraded", False)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.advice) as ex:
+        results = list(ex.map(advice, range(args.advice)))
+    wall = time.perf_counter() - t0
+    done.set()
+    prober.join()
+
+    lat = [r[0] for r in results]
+    statuses = {}
+    for _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"mode={args.mode} 조언 {args.advice}건 {wall:.2f}s, 상태 {statuses}, degraded {sum(r[2] for r in results)}건")
+    print(f"조언 지연 ms p50={pct(lat, 0.5)} p95={pct(lat, 0.95)} max={pct(lat, 1.0)}")
+    print(f"{args.probe} {len(probe_lat)}회 지연 ms p50={pct(probe_lat, 0.5)} p95={pct(probe_lat, 0.95)} "
+          f"max={pct(probe_lat, 1.0)}")
+    status, metrics = http("GET", args.url + "/metrics")
+    if status == 200:
+        print("rag_answers:", json.dumps(metrics.get("rag_answers"), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# cache_utils.py
+# 프로세스 내 LRU + TTL 캐시 (스레드 안전) 와 캐시 키용 텍스트 정규화
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+MISS = object()
+
+
+class LRUTTLCache:
+    """
+    maxsize 를 넘으면 가장 오래 사용하지 않은 항목부터 제거하고,
+    ttl(초)이 지난 항목은 조회 시 만료 처리한다. ttl=None 이면 만료 없음.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, name: str = "cache"):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISS):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return MISS if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str, strip_punct: bool = True) -> str:
+    """NFKC 정규화 후 (선택) 구두점 제거, 공백을 한 칸으로 접어 캐시 키로 사용"""
+    text = unicodedata.normalize("NFKC", text or "")
+    if strip_punct:
+        text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return _WS.sub(" ", text).strip()
@@ -0,0 +1,193 @@
+# db.py
+# 모든 모듈이 함께 쓰는 pymysql 커넥션 풀
+#
+# 설정은 환경 변수(.env)에서 읽는다.
+#   MYSQL_HOST / MYSQL_PORT / MYSQL_USER / MYSQL_PASSWORD / MYSQL_DATABASE
+#   MYSQL_CONNECT_TIMEOUT, MYSQL_READ_TIMEOUT, MYSQL_WRITE_TIMEOUT  (초)
+#   MYSQL_POOL_SIZE      : 프로세스당 최대 커넥션 수
+#   MYSQL_POOL_TIMEOUT   : 빈 커넥션을 기다리는 최대 시간(초). 넘으면 PoolTimeout
+#   MYSQL_POOL_RECYCLE   : 이 시간(초)보다 오래된 커넥션은 닫고 새로 연결
+#   MYSQL_POOL_PING_IDLE : 이 시간(초) 이상 놀던 커넥션은 빌려줄 때 ping 으로 상태 확인 (0 이면 매번)
+#
+# 사용법:
+#   with connection() as conn:
+#       with conn.cursor() as cur:
+#           ...
+#       conn.commit()
+# 블록을 빠져나오면 커밋되지 않은 작업은 롤백되고 커넥션은 풀로 돌아간다.
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+import pymysql.cursors
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MYSQL_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "127.0.0.1"),
+    "port": int(os.getenv("MYSQL_PORT", "3306")),
+    "user": os.getenv("MYSQL_USER", "root"),
+    "password": os.getenv("MYSQL_PASSWORD", "0000"),
+    "database": os.getenv("MYSQL_DATABASE", "emotion_db"),
+    "charset": "utf8mb4",
+    "cursorclass": pymysql.cursors.DictCursor,
+    "connect_timeout": int(os.getenv("MYSQL_CONNECT_TIMEOUT", "5")),
+    "read_timeout": int(os.getenv("MYSQL_READ_TIMEOUT", "30")),
+    "write_timeout": int(os.getenv("MYSQL_WRITE_TIMEOUT", "30")),
+}
+
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "3600"))
+POOL_PING_IDLE = float(os.getenv("MYSQL_POOL_PING_IDLE", "5"))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_idle=POOL_PING_IDLE):
+        self.config = config
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_idle = ping_idle
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = deque()  # (conn, last_used)
+        self._in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.failed_pings = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _check_fork(self):
+        # fork 된 자식은 부모의 소켓을 쓰면 안 된다. 닫지 말고(부모 세션까지 끊김) 버린다.
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def _connect(self):
+        conn = pymysql.connect(**self.config)
+        conn._pool_created_at = time.monotonic()
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.closed += 1
+
+    def acquire(self):
+        self._check_fork()
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"DB 커넥션 대기 시간 초과 ({self.timeout}s, pool size={self.size})")
+        waited = time.perf_counter() - t0
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    conn = self._connect()
+                    break
+
+                conn, last_used = item
+                now = time.monotonic()
+                if self.recycle and now - conn._pool_created_at > self.recycle:
+                    self._close(conn)
+                    continue
+                if now - last_used >= self.ping_idle:
+                    try:
+                        conn.ping(reconnect=False)
+                    except Exception:
+                        with self._lock:
+                            self.failed_pings += 1
+                        self._close(conn)
+                        continue
+                break
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.checkouts += 1
+            self._in_use += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return conn
+
+    def release(self, conn, broken=False):
+        if not broken:
+            try:
+                # 커밋되지 않은 작업과 읽기 스냅샷을 정리해 다음 사용자가 최신 데이터를 보게 한다
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._close(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "failed_pings": self.failed_pings,
+                "wait_ms_avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else None,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+
+pool = ConnectionPool(MYSQL_CONFIG)
+
+
+def connection():
+    return pool.connection()
+
+
+def pool_stats():
+    return pool.stats()
@@ -0,0 +1,69 @@
+# explain_check.py
+# 조회 쿼리를 EXPLAIN 해서 풀 스캔(type=ALL)이 없는지 확인
+# 사용법: python explain_check.py   (마이그레이션 적용 후, 실패 시 종료 코드 1)
+#
+#   ✅ 인덱스 사용
+#   ⚠️  사용할 수 있는 인덱스는 있으나 옵티마이저가 스캔을 고름 (행이 아주 적은 테이블에서 흔함)
+#   ❌ 사용할 수 있는 인덱스가 없음 (sargable 하지 않은 조건)
+import sys
+from datetime import date, timedelta
+
+from db import connection
+from SQL_function import (
+    CASE_SUMMARY_STAMP_SQL, SUMMARY_DAILY_SQL, SUMMARY_MONTHLY_SQL, SUMMARY_RANGE_SQL, SUMMARY_WEEKLY_SQL, week_start_of,
+)
+
+TODAY = date.today()
+MONTH_START = TODAY.replace(day=1)
+
+CHECKS = [
+    ("summary/daily", SUMMARY_DAILY_SQL, (TODAY, TODAY + timedelta(days=1))),
+    ("summary/week", SUMMARY_WEEKLY_SQL, (week_start_of(TODAY),)),
+    ("summary/monthly", SUMMARY_MONTHLY_SQL, (MONTH_START,)),
+    ("summary/weekly", SUMMARY_RANGE_SQL, (TODAY - timedelta(days=6), TODAY + timedelta(days=1))),
+    ("get_conversations", """
+        SELECT date, user_text, gpt_text FROM conversation_log
+        WHERE chat_id = %s ORDER BY date ASC, id ASC
+    """, (1,)),
+    ("get_conversations page", """
+        SELECT id, user_text, gpt_text FROM conversation_log
+        WHERE chat_id = %s AND (date > %s OR (date = %s AND id > %s))
+        ORDER BY date ASC, id ASC LIMIT 51
+    """, (1, TODAY, TODAY, 0)),
+    ("get_events", "SELECT event_text, event_type FROM events WHERE chat_id = %s", (1,)),
+    ("case_summary stamp", CASE_SUMMARY_STAMP_SQL, (1,)),  # Select tables optimized away 기대
+    ("case_summary events", """
+        SELECT id, event_text FROM events
+        WHERE chat_id = %s AND id < %s ORDER BY id DESC LIMIT 20
+    """, (1, 2 ** 62)),
+    ("dashboard mission", """
+        SELECT mission_id, is_completed FROM UserMissionStatus
+        WHERE user_id = %s AND mission_date = %s
+    """, (1, TODAY)),
+]
+
+
+def main():
+    failed = False
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for name, sql, params in CHECKS:
+                cur.execute("EXPLAIN " + sql, params)
+                for row in cur.fetchall():
+                    scan = row.get("type")
+                    if scan == "ALL" and not row.get("possible_keys"):
+                        mark, failed = "❌", True
+                    elif scan == "ALL":
+                        mark = "⚠️ "
+                    else:
+                        mark = "✅"
+                    print(f"{mark} {name:<20} table={row.get('table')} type={scan} "
+                          f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+    if failed:
+        print("❌ 인덱스를 쓸 수 없는 풀 스캔이 있습니다.")
+        sys.exit(1)
+    print("✅ 풀 스캔이 필요한 쿼리가 없습니다.")
+
+
+if __name__ == "__main__":
+    main()
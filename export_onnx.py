@@ -0,0 +1,77 @@
+# export_onnx.py
+# ./model 의 KoELECTRA 분류기를 ONNX로 내보내고, 선택적으로 동적 int8 양자화
+# 사용법: python export_onnx.py            → model/onnx/model.onnx + model/onnx/model.int8.onnx
+#         python export_onnx.py --no-quantize
+import argparse
+import os
+
+import torch
+from transformers import ElectraConfig, ElectraForSequenceClassification, ElectraTokenizerFast
+
+MODEL_PATH = "./model"
+OUT_DIR = os.path.join(MODEL_PATH, "onnx")
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+class _LogitsOnly(torch.nn.Module):
+    """ModelOutput 대신 logits 텐서만 반환하도록 감싸기"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        ).logits
+
+
+def export(out_path: str, opset: int = 14):
+    config = ElectraConfig.from_pretrained(MODEL_PATH, local_files_only=True)
+    tokenizer = ElectraTokenizerFast.from_pretrained(MODEL_PATH, local_files_only=True)
+    model = ElectraForSequenceClassification.from_pretrained(
+        MODEL_PATH, config=config, local_files_only=True
+    ).eval()
+
+    sample = tokenizer(["예시 문장입니다.", "배치와 길이가 가변이 되도록 두 문장을 넣습니다."],
+                       padding="longest", return_tensors="pt")
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            tuple(sample[name] for name in INPUT_NAMES),
+            out_path,
+            input_names=INPUT_NAMES,
+            output_names=["logits"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    print(f"✅ ONNX 저장: {out_path}")
+
+
+def quantize(src: str, dst: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    print(f"✅ int8 동적 양자화 저장: {dst}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out-dir", default=OUT_DIR)
+    ap.add_argument("--opset", type=int, default=14)
+    ap.add_argument("--no-quantize", action="store_true")
+    args = ap.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    fp32 = os.path.join(args.out_dir, "model.onnx")
+    export(fp32, opset=args.opset)
+    if not args.no_quantize:
+        quantize(fp32, os.path.join(args.out_dir, "model.int8.onnx"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# gunicorn.conf.py
+# 운영 서빙: 마스터가 모델을 한 번 로드한 뒤 워커를 fork → 가중치 메모리를 copy-on-write 로 공유
+# 실행: gunicorn -c gunicorn.conf.py app:app
+import gc
+import multiprocessing
+import os
+
+import torch
+
+# 마스터에서는 app import 시점에 모든 리소스를 동기 로드하고, 워밍업은 워커에서 한다
+os.environ.setdefault("APP_PRELOAD", "sync")
+_WARMUP = os.environ.get("APP_WARMUP", "1") == "1"
+os.environ["APP_WARMUP"] = "0"
+
+_CPUS = multiprocessing.cpu_count()
+
+bind = os.getenv("BIND", "127.0.0.1:5000")
+workers = int(os.getenv("WEB_WORKERS", str(max(1, _CPUS // 2))))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "8"))  # 워커당 요청 처리 스레드 (마이크로 배처가 이 요청들을 묶는다)
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
+# 워커당 torch intra-op 스레드: 코어를 워커 수로 나눠 과다 구독 방지
+TORCH_THREADS = int(os.getenv("TORCH_THREADS_PER_WORKER", str(max(1, _CPUS // workers))))
+
+# 설정 파일은 preload(app import)보다 먼저 실행된다.
+# fork 전 마스터에서 OpenMP 병렬 구간이 돌지 않도록 1스레드로 로드
+torch.set_num_threads(1)
+
+
+def when_ready(server):
+    # preload 된 객체들을 GC 추적에서 빼서, 워커에서 GC가 돌 때 공유 페이지를 건드리지 않게 한다
+    gc.collect()
+    gc.freeze()
+    server.log.info("master ready: workers=%s threads=%s torch_threads/worker=%s", workers, threads, TORCH_THREADS)
+
+
+def post_fork(server, worker):
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    import model as emotion_model
+    from rag_pipeline import rag_engine
+
+    emotion_model.after_fork()
+    rag_engine.after_fork()  # Chroma(SQLite) 클라이언트는 워커마다 새로 연다
+    if _WARMUP:
+        emotion_model.warmup()
+        rag_engine.warmup_embedder()
+    server.log.info("worker %s ready (torch_threads=%s)", worker.pid, TORCH_THREADS)
+
+
+def worker_exit(server, worker):
+    # write-behind 큐에 남은 로그 행을 모두 쓴 뒤 종료
+    from SQL_function import log_buffer
+
+    log_buffer.close(timeout=graceful_timeout)
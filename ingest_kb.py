@@ -1,5 +1,12 @@
 # ingest_kb.py
-import os, glob, uuid, hashlib
+# rag_data/*.txt → Chroma kb_advice_v1 (증분 인제스트)
+# rag_store/ingest_manifest.json 에 파일별 내용 해시와 청크 ID 를 기록해 두고,
+# 내용이 바뀐 파일만 다시 임베딩해 한 번에 upsert 하고 더 이상 없는 청크는 지운다.
+#
+# 사용법:
+#   python ingest_kb.py          # 바뀐 파일만
+#   python ingest_kb.py --full   # 모든 파일 재임베딩 + 디스크에 없는 source 청크 정리
+import os, glob, uuid, hashlib, json, argparse, time
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
@@ -7,6 +14,8 @@ from sentence_transformers import SentenceTransformer
 EMB_MODEL = "jhgan/ko-sroberta-multitask"  # 가볍고 한국어 OK
 CHUNK_SIZE, OVERLAP = 600, 120
 PERSIST_DIR = "rag_store"
+DATA_GLOB = "rag_data/*.txt"
+MANIFEST_PATH = os.path.join(PERSIST_DIR, "ingest_manifest.json")
 
 def chunk_text(t, size=CHUNK_SIZE, overlap=OVERLAP):
     out, i = [], 0
@@ -34,7 +43,46 @@ def stable_id(source: str, chunk_index: int, text: str) -> str:
     h = hashlib.sha1(f"{source}::{chunk_index}::{text}".encode("utf-8")).hexdigest()
     return f"{h}"
 
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def load_manifest(path=MANIFEST_PATH) -> dict:
+    """{"settings": {...}, "files": {source: {"sha256", "ids"}}} (없거나 깨졌으면 빈 매니페스트)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get("files"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"settings": {}, "files": {}}
+
+def save_manifest(manifest: dict, path=MANIFEST_PATH):
+    # 중간에 죽어도 매니페스트가 깨지지 않도록 임시 파일에 쓰고 교체
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def ingest_settings() -> dict:
+    # 임베딩 모델/청크 설정이 바뀌면 모든 파일을 다시 임베딩해야 한다
+    return {"emb_model": EMB_MODEL, "chunk_size": CHUNK_SIZE, "overlap": OVERLAP}
+
+def delete_stale(coll, source: str, keep_ids) -> int:
+    """source 의 청크 중 keep_ids 에 없는 것을 삭제"""
+    keep = set(keep_ids)
+    existing = coll.get(where={"source": source}, include=[])["ids"]
+    stale = [uid for uid in existing if uid not in keep]
+    if stale:
+        coll.delete(ids=stale)
+    return len(stale)
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="매니페스트를 무시하고 모든 파일을 다시 인제스트")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
     os.makedirs(PERSIST_DIR, exist_ok=True)
     client = chromadb.PersistentClient(
         path=PERSIST_DIR,
@@ -45,41 +93,76 @@ def main():
         metadata={"hnsw:space":"cosine"}
     )
 
-    model = SentenceTransformer(EMB_MODEL)
+    manifest = load_manifest()
+    full = args.full or manifest.get("settings") != ingest_settings()
+    if full and not args.full:
+        print("ℹ️  임베딩/청크 설정이 바뀌어 전체 재인제스트합니다.")
+    old_files = {} if full else manifest["files"]
+    new_files = {}
+    model = None  # 바뀐 파일이 있을 때만 로드
+    stats = {"skipped": 0, "upserted": 0, "chunks": 0, "deleted": 0}
 
-    for fp in glob.glob("rag_data/*.txt"):
+    for fp in sorted(glob.glob(DATA_GLOB)):
+        source = os.path.basename(fp)
         category = category_from_filename(fp)
         section  = section_from_filename(fp)
         if not category:
             print(f"⚠️  카테고리를 알 수 없어 건너뜀: {fp}")
             continue
 
-        with open(fp, "r", encoding="utf-8") as f:
-            full = f.read().strip()
-        if not full:
+        with open(fp, "rb") as f:
+            raw = f.read()
+        digest = file_hash(raw)
+        prev = old_files.get(source)
+        if prev and prev.get("sha256") == digest:
+            new_files[source] = prev
+            stats["skipped"] += 1
+            continue
+
+        full_text = raw.decode("utf-8").strip()
+        if not full_text:
             print(f"⚠️  빈 파일 건너뜀: {fp}")
+            stats["deleted"] += delete_stale(coll, source, [])
             continue
 
-        chunks = chunk_text(full)
-
-        # 배치 임베딩으로 속도 향상
-        embs = model.encode(chunks, batch_size=16, show_progress_bar=True)
-        for idx, (ch, emb) in enumerate(zip(chunks, embs)):
-            source = os.path.basename(fp)
-            uid = stable_id(source, idx, ch)  # <- uuid 대신 안정적 ID
-            coll.add(
-                documents=[ch],
-                embeddings=[emb.tolist() if hasattr(emb, "tolist") else list(emb)],
-                metadatas=[{
-                    "category": category,     # 필수: RAG where 필터
-                    "section":  section,      # ★ 추가: 섹션 필터 (대처방안/신고처/예방팁 등)
-                    "source":   source,
-                    "chunk_index": idx
-                }],
-                ids=[uid]
-            )
-
-    print("✅ Ingest finished.")
+        chunks = chunk_text(full_text)
+        ids = [stable_id(source, idx, ch) for idx, ch in enumerate(chunks)]  # <- uuid 대신 안정적 ID
+
+        if model is None:
+            model = SentenceTransformer(EMB_MODEL)
+        # 배치 임베딩 + 파일당 한 번의 upsert
+        embs = model.encode(chunks, batch_size=16, show_progress_bar=False)
+        coll.upsert(
+            documents=chunks,
+            embeddings=[emb.tolist() if hasattr(emb, "tolist") else list(emb) for emb in embs],
+            metadatas=[{
+                "category": category,     # 필수: RAG where 필터
+                "section":  section,      # ★ 추가: 섹션 필터 (대처방안/신고처/예방팁 등)
+                "source":   source,
+                "chunk_index": idx
+            } for idx in range(len(chunks))],
+            ids=ids
+        )
+        # 내용이 바뀌면 ID 도 바뀌므로 이전 버전의 청크를 정리
+        stats["deleted"] += delete_stale(coll, source, ids)
+        new_files[source] = {"sha256": digest, "ids": ids}
+        stats["upserted"] += 1
+        stats["chunks"] += len(chunks)
+        print(f"↻ {source}: 청크 {len(chunks)}개")
+
+    # 디스크에서 사라진 파일의 청크 삭제
+    gone = set(manifest["files"]) - set(new_files)
+    if full:
+        # 매니페스트에 없던 source (이전 방식으로 인제스트된 청크 등)까지 정리
+        metas = coll.get(include=["metadatas"])["metadatas"] or []
+        gone |= {m.get("source") for m in metas if m and m.get("source")} - set(new_files)
+    for source in sorted(gone):
+        stats["deleted"] += delete_stale(coll, source, [])
+        print(f"🗑  {source}: 삭제된 파일의 청크 제거")
+
+    save_manifest({"settings": ingest_settings(), "files": new_files})
+    print(f"✅ Ingest finished in {time.perf_counter() - t0:.1f}s "
+          f"(변경 {stats['upserted']}개 파일/{stats['chunks']}청크, 건너뜀 {stats['skipped']}, 삭제 {stats['deleted']}청크)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
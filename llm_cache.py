@@ -0,0 +1,171 @@
+# llm_cache.py
+# RAGEngine.generate_json 응답을 디스크(SQLite)에 캐시 → 재시작해도 유지, 워커끼리 공유
+# 키: sha256(모델, temperature, 시스템 프롬프트, 렌더링된 _TEMPLATE 프롬프트)
+#
+#   RAG_LLM_CACHE=0             : 끄기 (기본 1)
+#   RAG_LLM_CACHE_PATH          : SQLite 파일 (기본 rag_store/llm_cache.sqlite3)
+#   RAG_LLM_CACHE_TTL           : 항목 유지 시간(초)
+#   RAG_LLM_CACHE_MAX_ENTRIES   : 최대 항목 수. 넘으면 가장 오래 안 쓰인 것부터 삭제
+#   RAG_LLM_CACHE_SKIP_RAW=0    : JSON 파싱 실패 응답("_raw" 포함)도 캐시 (기본은 저장하지 않음)
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("RAG_LLM_CACHE", "1") == "1"
+CACHE_PATH = os.getenv("RAG_LLM_CACHE_PATH", os.path.join("rag_store", "llm_cache.sqlite3"))
+TTL = float(os.getenv("RAG_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("RAG_LLM_CACHE_MAX_ENTRIES", "5000"))
+SKIP_RAW = os.getenv("RAG_LLM_CACHE_SKIP_RAW", "1") == "1"
+EVICT_EVERY = 100  # 저장 N번마다 만료/초과 항목 정리
+
+
+def prompt_key(model: str, temperature: float, system: str, prompt: str) -> str:
+    body = json.dumps([model, temperature, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path=CACHE_PATH, ttl=TTL, max_entries=MAX_ENTRIES, skip_raw=SKIP_RAW, enabled=ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.skip_raw = skip_raw
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.errors = 0
+        self.saved_latency = 0.0  # 캐시 적중으로 아낀 원래 LLM 호출 시간 합(초)
+
+    # ------------------------------------------------------
+    # 스레드별 커넥션 (fork 후에는 새로 연다)
+    # ------------------------------------------------------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            with self._lock:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key         TEXT PRIMARY KEY,
+                        value       TEXT NOT NULL,
+                        created_at  REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        latency     REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ------------------------------------------------------
+    # 조회 / 저장
+    # ------------------------------------------------------
+    def get(self, key):
+        """적중하면 파싱된 응답(dict), 아니면 None"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, latency FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            self._count("errors")
+            logger.warning("LLM 캐시 조회 실패 → 캐시 없이 진행", exc_info=True)
+            return None
+        with self._lock:
+            self.hits += 1
+            self.saved_latency += row[1]
+        return json.loads(row[0])
+
+    def set(self, key, value: dict, latency: float):
+        if not self.enabled:
+            return
+        if self.skip_raw and "_raw" in value:
+            self._count("skipped")
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access, latency) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now, latency),
+            )
+            with self._lock:
+                self.stores += 1
+                evict = self.stores % EVICT_EVERY == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error:
+            self._count("errors")
+            logger.warning("LLM 캐시 저장 실패", exc_info=True)
+
+    def evict(self):
+        """만료 항목과 MAX_ENTRIES 초과분(오래 안 쓰인 순)을 삭제"""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (time.time() - self.ttl,)).rowcount
+        removed += conn.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,)).rowcount
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def stats(self) -> dict:
+        size = None
+        if self.enabled:
+            try:
+                size = self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "path": self.path,
+                "size": size,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "stores": self.stores,
+                "skipped_raw": self.skipped,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "saved_latency_s": round(self.saved_latency, 3),
+                "saved_latency_ms_avg": round(self.saved_latency / self.hits * 1000, 1) if self.hits else None,
+            }
+
+
+llm_cache = LLMResponseCache()
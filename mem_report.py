@@ -0,0 +1,56 @@
+# mem_report.py
+# gunicorn 마스터와 워커들의 메모리 사용량(RSS / PSS / 공유 / 전용) 출력 (Linux 전용)
+# 사용법: python mem_report.py <master_pid>
+#   PSS  : 공유 페이지를 공유 프로세스 수로 나눠 더한 값 → 프로세스별 실제 부담
+#   전용 : 해당 프로세스만 쓰는 페이지 → 워커를 하나 늘릴 때 추가되는 메모리
+import sys
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def rollup(pid):
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return out
+
+
+def mb(kb):
+    return kb / 1024
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("사용법: python mem_report.py <master_pid>")
+    master = int(sys.argv[1])
+    pids = [("master", master)] + [("worker", p) for p in children(master)]
+
+    print(f"{'role':>8} {'pid':>8} {'RSS(MB)':>9} {'PSS(MB)':>9} {'shared(MB)':>11} {'private(MB)':>12}")
+    total_pss = 0
+    worker_private = []
+    for role, pid in pids:
+        r = rollup(pid)
+        shared = r.get("Shared_Clean", 0) + r.get("Shared_Dirty", 0)
+        private = r.get("Private_Clean", 0) + r.get("Private_Dirty", 0)
+        total_pss += r.get("Pss", 0)
+        if role == "worker":
+            worker_private.append(private)
+        print(f"{role:>8} {pid:>8} {mb(r.get('Rss', 0)):>9.1f} {mb(r.get('Pss', 0)):>9.1f} "
+              f"{mb(shared):>11.1f} {mb(private):>12.1f}")
+
+    print(f"\n전체 PSS 합계: {mb(total_pss):.1f} MB ({len(pids) - 1} workers)")
+    if worker_private:
+        print(f"워커 1개 추가 비용(전용 메모리 평균): {mb(sum(worker_private) / len(worker_private)):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# migrate.py
+# migrations/*.sql 을 버전 순서대로 한 번씩 적용
+# 사용법: python migrate.py           → 미적용 마이그레이션 적용
+#         python migrate.py --list    → 적용 여부 확인
+#
+# - 파일 이름 앞의 번호(001_, 002_ ...)가 버전이며, 적용 이력은 schema_migrations 테이블에 남는다.
+# - 문장은 줄 끝의 ';' 로 나눠 순서대로 실행한다.
+# - MySQL 의 DDL 은 자동 커밋되므로, 각 파일은 중간에 실패해도 다시 실행할 수 있게(IF NOT EXISTS 등) 작성한다.
+import argparse
+import glob
+import os
+import re
+
+import pymysql
+
+from db import MYSQL_CONFIG
+
+MIGRATIONS_DIR = "migrations"
+
+
+def split_statements(sql: str):
+    lines = [ln for ln in sql.splitlines() if not ln.strip().startswith("--")]
+    parts = re.split(r";\s*$", "\n".join(lines), flags=re.MULTILINE)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def migration_files():
+    files = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql")))
+    return [(os.path.basename(fp).split("_", 1)[0], fp) for fp in files]
+
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    VARCHAR(32)  NOT NULL PRIMARY KEY,
+            name       VARCHAR(255) NOT NULL,
+            applied_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row["version"] for row in cur.fetchall()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--list", action="store_true", help="적용 여부만 출력")
+    args = ap.parse_args()
+
+    # 큰 테이블 ALTER 는 오래 걸릴 수 있으므로 풀 대신 읽기/쓰기 타임아웃 없는 전용 커넥션 사용
+    conn = pymysql.connect(**{**MYSQL_CONFIG, "read_timeout": None, "write_timeout": None})
+    try:
+        with conn.cursor() as cur:
+            done = applied_versions(cur)
+            conn.commit()
+
+            for version, fp in migration_files():
+                name = os.path.basename(fp)
+                if args.list:
+                    print(f"{'✅' if version in done else '⏳'} {name}")
+                    continue
+                if version in done:
+                    continue
+
+                with open(fp, "r", encoding="utf-8") as f:
+                    statements = split_statements(f.read())
+                print(f"▶ {name} ({len(statements)} statements)")
+                for stmt in statements:
+                    cur.execute(stmt)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name),
+                )
+                conn.commit()
+                print(f"✅ {name}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+-- 001: emotion_summary 에 (date, emotion) UNIQUE 키
+-- update_emotion_summary_all 의 INSERT ... ON DUPLICATE KEY UPDATE 가 이 키에 의존한다.
+
+CREATE TABLE IF NOT EXISTS emotion_summary (
+    date             DATE        NOT NULL,
+    emotion          VARCHAR(20) NOT NULL,
+    total_confidence DOUBLE      NOT NULL DEFAULT 0,
+    count            INT         NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_emotion_summary_date_emotion (date, emotion)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 기존 테이블에 같은 (date, emotion) 행이 여러 개 있으면 하나로 합친다
+CREATE TEMPORARY TABLE _emotion_summary_dup AS
+    SELECT date, emotion, SUM(total_confidence) AS total_confidence, SUM(count) AS count
+      FROM emotion_summary
+     GROUP BY date, emotion
+    HAVING COUNT(*) > 1;
+
+DELETE es
+  FROM emotion_summary es
+  JOIN _emotion_summary_dup d ON d.date = es.date AND d.emotion = es.emotion;
+
+INSERT INTO emotion_summary (date, emotion, total_confidence, count)
+SELECT date, emotion, total_confidence, count FROM _emotion_summary_dup;
+
+DROP TEMPORARY TABLE _emotion_summary_dup;
+
+-- UNIQUE 키가 없을 때만 추가 (MySQL 은 ADD INDEX IF NOT EXISTS 를 지원하지 않음)
+SET @has_key := (
+    SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE()
+       AND table_name = 'emotion_summary'
+       AND index_name = 'uq_emotion_summary_date_emotion'
+);
+SET @ddl := IF(@has_key = 0,
+    'ALTER TABLE emotion_summary ADD UNIQUE KEY uq_emotion_summary_date_emotion (date, emotion)',
+    'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
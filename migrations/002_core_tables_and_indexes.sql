@@ -0,0 +1,108 @@
+-- 002: 서비스 테이블 DDL 과 조회 경로별 인덱스
+--   conversation_log  (chat_id, date, id)   : /get_conversations
+--   events            (chat_id, id)         : /get_events, /rag/advise
+--   UserMissionStatus (user_id, mission_date) UNIQUE : 대시보드 / 미션 완료 (하루 한 행)
+-- 이미 있는 테이블은 그대로 두고, 빠진 인덱스만 추가한다.
+
+CREATE TABLE IF NOT EXISTS emotion_logs (
+    id          BIGINT      NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    sentence    TEXT        NOT NULL,
+    top_emotion VARCHAR(20) NOT NULL,
+    confidence  DOUBLE      NOT NULL,
+    created_at  DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS conversation_log (
+    id        BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    chat_id   BIGINT NOT NULL,
+    date      DATE   NOT NULL,
+    user_text TEXT,
+    gpt_text  TEXT,
+    KEY idx_conversation_log_chat_date_id (chat_id, date, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS events (
+    id         BIGINT      NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    chat_id    BIGINT      NOT NULL,
+    event_text TEXT        NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    KEY idx_events_chat_id (chat_id, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS DailyMission (
+    mission_id INT          NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    title      VARCHAR(255) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS UserMissionStatus (
+    id           BIGINT  NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id      INT     NOT NULL,
+    mission_id   INT     NOT NULL,
+    mission_date DATE    NOT NULL,
+    is_completed BOOLEAN NOT NULL DEFAULT FALSE,
+    UNIQUE KEY uq_user_mission_status_user_date (user_id, mission_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS UserCharacter (
+    user_id      INT NOT NULL PRIMARY KEY,
+    total_exp    INT NOT NULL DEFAULT 0,
+    level        INT NOT NULL DEFAULT 1,
+    next_exp_req INT NOT NULL DEFAULT 5
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- conversation_log (chat_id, date, id)
+SET @has_key := (
+    SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'conversation_log'
+       AND index_name = 'idx_conversation_log_chat_date_id'
+);
+SET @ddl := IF(@has_key = 0,
+    'ALTER TABLE conversation_log ADD KEY idx_conversation_log_chat_date_id (chat_id, date, id)',
+    'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- events (chat_id, id)
+SET @has_key := (
+    SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'events'
+       AND index_name = 'idx_events_chat_id'
+);
+SET @ddl := IF(@has_key = 0,
+    'ALTER TABLE events ADD KEY idx_events_chat_id (chat_id, id)',
+    'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- UserMissionStatus: 같은 (user_id, mission_date) 행이 여러 개면 하나로 합친 뒤 UNIQUE 키 추가
+-- (완료된 행이 있으면 완료 상태와 그 미션을 남긴다)
+CREATE TEMPORARY TABLE _ums_dup AS
+    SELECT user_id, mission_date,
+           MAX(is_completed) AS is_completed,
+           COALESCE(MAX(CASE WHEN is_completed THEN mission_id END), MAX(mission_id)) AS mission_id
+      FROM UserMissionStatus
+     GROUP BY user_id, mission_date
+    HAVING COUNT(*) > 1;
+
+DELETE ums
+  FROM UserMissionStatus ums
+  JOIN _ums_dup d ON d.user_id = ums.user_id AND d.mission_date = ums.mission_date;
+
+INSERT INTO UserMissionStatus (user_id, mission_id, mission_date, is_completed)
+SELECT user_id, mission_id, mission_date, is_completed FROM _ums_dup;
+
+DROP TEMPORARY TABLE _ums_dup;
+
+SET @has_key := (
+    SELECT COUNT(*) FROM information_schema.statistics
+     WHERE table_schema = DATABASE() AND table_name = 'UserMissionStatus'
+       AND index_name = 'uq_user_mission_status_user_date'
+);
+SET @ddl := IF(@has_key = 0,
+    'ALTER TABLE UserMissionStatus ADD UNIQUE KEY uq_user_mission_status_user_date (user_id, mission_date)',
+    'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,36 @@
+-- 003: 주(ISO, 월요일 시작) / 월 단위 감정 롤업 테이블
+-- _apply_emotion_summary 가 emotion_summary 와 같은 트랜잭션에서 함께 누적한다.
+-- 어긋났을 때는 python rebuild_rollups.py 로 emotion_summary 에서 다시 계산한다.
+
+CREATE TABLE IF NOT EXISTS emotion_summary_weekly (
+    week_start       DATE        NOT NULL,
+    emotion          VARCHAR(20) NOT NULL,
+    total_confidence DOUBLE      NOT NULL DEFAULT 0,
+    count            INT         NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_emotion_summary_weekly_week_emotion (week_start, emotion)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS emotion_summary_monthly (
+    month_start      DATE        NOT NULL,
+    emotion          VARCHAR(20) NOT NULL,
+    total_confidence DOUBLE      NOT NULL DEFAULT 0,
+    count            INT         NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_emotion_summary_monthly_month_emotion (month_start, emotion)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 기존 일별 데이터로 채우기 (다시 실행해도 같은 값으로 덮어쓴다)
+INSERT INTO emotion_summary_weekly (week_start, emotion, total_confidence, count)
+SELECT date - INTERVAL WEEKDAY(date) DAY, emotion, SUM(total_confidence), SUM(count)
+  FROM emotion_summary
+ GROUP BY date - INTERVAL WEEKDAY(date) DAY, emotion
+ON DUPLICATE KEY UPDATE
+    total_confidence = VALUES(total_confidence),
+    count = VALUES(count);
+
+INSERT INTO emotion_summary_monthly (month_start, emotion, total_confidence, count)
+SELECT date - INTERVAL (DAYOFMONTH(date) - 1) DAY, emotion, SUM(total_confidence), SUM(count)
+  FROM emotion_summary
+ GROUP BY date - INTERVAL (DAYOFMONTH(date) - 1) DAY, emotion
+ON DUPLICATE KEY UPDATE
+    total_confidence = VALUES(total_confidence),
+    count = VALUES(count);
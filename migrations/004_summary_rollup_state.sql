@@ -0,0 +1,8 @@
+-- 004: 롤업 재계산 시각 (한 행)
+-- rebuild_rollups.py 가 재계산과 같은 트랜잭션에서 갱신하고,
+-- summary_cache 가 이 값을 캐시 키와 Last-Modified 에 넣어 모든 워커의 요약 캐시를 무효화한다.
+
+CREATE TABLE IF NOT EXISTS summary_rollup_state (
+    id         TINYINT     NOT NULL PRIMARY KEY,
+    rebuilt_at DATETIME(6) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,86 @@
+# mission_catalog.py
+# DailyMission 목록을 프로세스 메모리에 두고 백그라운드에서 주기적으로 갱신
+# 오늘의 미션은 (user_id, 날짜) 해시로 목록에서 고르므로 같은 날에는 항상 같은 미션이 나온다.
+#
+#   MISSION_CATALOG_REFRESH : 갱신 주기(초)
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from db import connection
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv("MISSION_CATALOG_REFRESH", "300"))
+
+
+class MissionCatalog:
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._missions = ()  # ((mission_id, title), ...) mission_id 순
+        self._loaded_at = None
+        self._pid = None
+        self._worker = None
+        self.refreshes = 0
+        self.errors = 0
+
+    def refresh(self):
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT mission_id, title FROM DailyMission ORDER BY mission_id")
+                missions = tuple((row["mission_id"], row["title"]) for row in cur.fetchall())
+        with self._lock:
+            self._missions = missions
+            self._loaded_at = time.time()
+            self.refreshes += 1
+        return missions
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                logger.exception("DailyMission 목록 갱신 실패 (이전 목록 유지)")
+
+    def _ensure_worker(self):
+        # fork 된 워커는 자기 갱신 스레드를 새로 띄운다
+        if self._pid == os.getpid() and self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._worker is None or not self._worker.is_alive():
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="mission-catalog", daemon=True)
+                self._worker.start()
+
+    def missions(self):
+        self._ensure_worker()
+        if self._loaded_at is None:
+            self.refresh()  # 첫 호출만 요청 안에서 읽는다
+        return self._missions
+
+    def pick(self, user_id, day):
+        """(user_id, day) 에 대해 항상 같은 (mission_id, title). 목록이 비었으면 None"""
+        missions = self.missions()
+        if not missions:
+            return None
+        digest = hashlib.sha256(f"{user_id}:{day.isoformat()}".encode()).digest()
+        return missions[int.from_bytes(digest[:8], "big") % len(missions)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._missions),
+                "loaded_at": self._loaded_at,
+                "refresh_interval": self.refresh_interval,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+            }
+
+
+mission_catalog = MissionCatalog()
@@ -0,0 +1,144 @@
+# mock_openai_server.py
+# OpenAI 호환 /v1/chat/completions 목 서버 (표준 라이브러리만 사용)
+# 실제 API 없이 RAG 동시성/지연 예산/재시도를 시험할 때 사용
+#
+# 사용법:
+#   python mock_openai_server.py --port 8089 --delay 2.0 --jitter 0.5 --fail-rate 0.05
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock gunicorn -c gunicorn.conf.py app:app
+#   GET /stats → 요청 수, 동시 처리 최대치, 실패 수
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock = threading.Lock()
+_stats = {"requests": 0, "streams": 0, "failures": 0, "inflight": 0, "inflight_peak": 0}
+
+
+def answer_for(prompt: str) -> str:
+    def field(name):
+        m = re.search(rf"\[{name}\]\n(.+)", prompt)
+        return m.group(1).strip() if m else ""
+
+    category, section = field("카테고리"), field("섹션")
+    return json.dumps({
+        "category": category,
+        "section": section,
+        "immediate_actions": [f"{category} 목 응답: 즉시 조치"],
+        "next_steps": ["목 응답: 다음 단계"],
+        "prevention_tips": ["목 응답: 예방 팁"],
+        "where_to_report": [{"name": "경찰청", "type": "전화", "value": "112", "note": "목 응답"}],
+        "source_citations": [{"title": f"{category} 관련 자료", "url": ""}],
+        "disclaimer": "본 내용은 법률/투자 자문이 아닙니다. 긴급 상황은 112/금융회사 공식채널로 연락하세요.",
+    }, ensure_ascii=False)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    args = None
+
+    def log_message(self, fmt, *a):
+        if self.args.verbose:
+            super().log_message(fmt, *a)
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with _lock:
+                return self._json(200, dict(_stats))
+        self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+
+        with _lock:
+            _stats["requests"] += 1
+            _stats["inflight"] += 1
+            _stats["inflight_peak"] = max(_stats["inflight_peak"], _stats["inflight"])
+        try:
+            time.sleep(max(0.0, self.args.delay + random.uniform(-self.args.jitter, self.args.jitter)))
+            if random.random() < self.args.fail_rate:
+                with _lock:
+                    _stats["failures"] += 1
+                return self._json(random.choice([429, 500, 503]), {"error": {"message": "mock failure"}})
+
+            prompt = next((m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user"), "")
+            content = answer_for(prompt)
+            if body.get("stream"):
+                self._stream(body, content)
+            else:
+                self._json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+        finally:
+            with _lock:
+                _stats["inflight"] -= 1
+
+    def _stream(self, body, content):
+        with _lock:
+            _stats["streams"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        cid = f"chatcmpl-{uuid.uuid4().hex}"
+        step = max(1, self.args.chunk_chars)
+        for i in range(0, len(content), step):
+            chunk = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.args.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--delay", type=float, default=1.5, help="응답 전 대기(초)")
+    ap.add_argument("--jitter", type=float, default=0.5, help="대기 시간 ± 편차(초)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="429/5xx 로 실패시킬 비율")
+    ap.add_argument("--chunk-chars", type=int, default=8, help="스트리밍 조각 글자 수")
+    ap.add_argument("--token-delay", type=float, default=0.02, help="스트리밍 조각 간격(초)")
+    ap.add_argument("--verbose", action="store_true")
+    Handler.args = ap.parse_args()
+
+    server = ThreadingHTTPServer((Handler.args.host, Handler.args.port), Handler)
+    server.daemon_threads = True
+    print(f"mock OpenAI server on http://{Handler.args.host}:{Handler.args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,262 @@
+import os
+import hashlib
+import threading
+import numpy as np
 import torch
-import torch.nn.functional as F
 import joblib
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, AutoConfig
+from dotenv import load_dotenv
 # ✅ 감정 예측 함수
 # ✅ 모델 경로 및 디바이스
-from transformers import ElectraConfig, ElectraTokenizer, ElectraForSequenceClassification
-import torch
-import joblib
+from transformers import ElectraConfig, ElectraTokenizerFast, ElectraForSequenceClassification
+from batching import MicroBatcher
+from cache_utils import LRUTTLCache, MISS, normalize_text
+load_dotenv()
 
 # 경로
 MODEL_PATH = "./model"
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# KoElectra 기반 구성
-config = ElectraConfig.from_pretrained(MODEL_PATH, local_files_only=True)
-tokenizer = ElectraTokenizer.from_pretrained(MODEL_PATH, local_files_only=True)
-model = ElectraForSequenceClassification.from_pretrained(
-    MODEL_PATH,
-    config=config,
-    local_files_only=True
-).to(DEVICE)
+# 추론 백엔드: torch(기본) | onnx (export_onnx.py 로 만든 ONNX 모델을 ONNX Runtime CPU로 실행)
+BACKEND = os.getenv("EMOTION_BACKEND", "torch")
+ONNX_PATH = os.getenv("EMOTION_ONNX_PATH", f"{MODEL_PATH}/onnx/model.int8.onnx")
+
+# 동시 요청 배치 설정
+BATCHING_ENABLED = os.getenv("EMOTION_BATCHING", "1") == "1"
+BATCH_MAX_SIZE = int(os.getenv("EMOTION_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMOTION_BATCH_MAX_WAIT_MS", "5"))
+
+# 예측 캐시 설정: (모델 버전, 정규화된 문장) → 결과
+# 모델 버전은 모델을 로드할 때 한 번 계산한다. ./model 을 바꿨으면 프로세스를 재시작해야 새 모델/버전이 적용된다
+CACHE_ENABLED = os.getenv("EMOTION_CACHE", "1") == "1"
+CACHE_MAXSIZE = int(os.getenv("EMOTION_CACHE_MAXSIZE", "10000"))
+CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", "3600"))
+
+# 토큰 길이 설정: 배치 내 최장 문장 길이까지만 패딩
+# EMOTION_LENGTH_BUCKETS="16,32,64" 처럼 주면 비슷한 길이끼리 묶어 forward
+MAX_LENGTH = 128
+LENGTH_BUCKETS = sorted(int(b) for b in os.getenv("EMOTION_LENGTH_BUCKETS", "").split(",") if b.strip())
+
+# KoElectra 구성 / 토크나이저 / 라벨 인코더 / 백엔드는 load() 에서 한 번만 로드
+config = None
+tokenizer = None
+label_encoder = None
+label_names = None
+backend = None
+_model_version = None  # 로드한 모델 파일로 만든 버전 해시 (예측 캐시 키)
+_load_lock = threading.Lock()
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self):
+        self.model = ElectraForSequenceClassification.from_pretrained(
+            MODEL_PATH,
+            config=config,
+            local_files_only=True
+        ).to(DEVICE)
+        self.model.eval()
+
+    def logits(self, features):
+        inputs = tokenizer.pad(features, padding="longest", return_tensors="pt").to(DEVICE)
+        with torch.no_grad():
+            return self.model(**inputs).logits.float().cpu().numpy()
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path=ONNX_PATH):
+        import onnxruntime as ort  # onnx 백엔드를 쓸 때만 필요
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("EMOTION_ONNX_THREADS", "0"))  # 0 = ORT 기본값
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.path = path
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def logits(self, features):
+        inputs = tokenizer.pad(features, padding="longest", return_tensors="np")
+        feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        return self.session.run(["logits"], feed)[0]
+
+
+def load_backend(name=BACKEND):
+    if name == "torch":
+        return TorchBackend()
+    if name == "onnx":
+        return OnnxBackend()
+    raise ValueError(f"알 수 없는 EMOTION_BACKEND: {name} (torch | onnx)")
+
+
+def load():
+    """모델 리소스 로드 (여러 번 불러도 한 번만 로드, 스레드 안전)"""
+    global config, tokenizer, label_encoder, label_names, backend, _model_version
+    if backend is not None:
+        return
+    with _load_lock:
+        if backend is not None:
+            return
+        config = ElectraConfig.from_pretrained(MODEL_PATH, local_files_only=True)
+        tokenizer = ElectraTokenizerFast.from_pretrained(MODEL_PATH, local_files_only=True)  # Rust 토크나이저
+        label_encoder = joblib.load(f"{MODEL_PATH}/KoELECTRA.pkl")
+        label_names = label_encoder.classes_
+        backend = load_backend()
+        _model_version = _model_dir_signature()
+
+
+def load_label_names():
+    """라벨 이름만 필요할 때 (가중치 로드 없이 라벨 인코더만 읽음)"""
+    if label_names is not None:
+        return label_names
+    return joblib.load(f"{MODEL_PATH}/KoELECTRA.pkl").classes_
+
+
+def is_ready():
+    return backend is not None
+
+
+def after_fork():
+    """fork 된 워커에서 호출. ONNX Runtime 세션은 스레드 풀이 fork 를 견디지 못하므로 다시 만든다"""
+    global backend, _model_version
+    if backend is not None and backend.name == "onnx":
+        backend = OnnxBackend(backend.path)
+        _model_version = _model_dir_signature()  # 파일을 다시 읽었으므로 버전도 다시 계산
+
+
+def warmup():
+    """더미 forward 한 번으로 첫 요청의 초기화/메모리 할당 비용을 미리 치름"""
+    load()
+    predict_probs(["워밍업용 문장입니다."])
 
-# 라벨 인코더
-label_encoder = joblib.load(f"{MODEL_PATH}/KoELECTRA.pkl")
-label_names = label_encoder.classes_
 
+def _softmax(logits):
+    z = logits - logits.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _bucket_of(length):
+    for b in LENGTH_BUCKETS:
+        if length <= b:
+            return b
+    return MAX_LENGTH
+
+
+def predict_probs(texts, using=None):
+    """문장 리스트 → (문장 수, 라벨 수) 확률 배열 (입력 순서 유지). using: 백엔드 지정(기본: 현재 백엔드)"""
+    load()
+    be = using or backend
+    enc = tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+    features = [{k: enc[k][i] for k in enc.keys()} for i in range(len(texts))]
+
+    # 길이 버킷별로 묶기 (버킷 미설정 시 전체가 한 묶음)
+    groups = {}
+    for i, feat in enumerate(features):
+        key = _bucket_of(len(feat["input_ids"])) if LENGTH_BUCKETS else MAX_LENGTH
+        groups.setdefault(key, []).append(i)
+
+    probs = np.zeros((len(texts), len(label_names)), dtype=np.float32)
+    for idxs in groups.values():
+        # 최장 길이까지만 패딩해 forward
+        probs[idxs] = _softmax(be.logits([features[i] for i in idxs]))
+    return probs
+
+
+def _forward(texts):
+    """문장 리스트를 분류 → 문장별 {라벨: 퍼센트} 리스트"""
+    return [
+        {label: round(float(prob) * 100, 2) for label, prob in zip(label_names, row)}
+        for row in predict_probs(texts)
+    ]
+
+
+# 동시에 들어온 /predict 요청을 모아 한 번에 forward
+batcher = MicroBatcher(_forward, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, name="emotion")
+
+
+# ----------------------------------------------------------
+# 예측 캐시
+# ----------------------------------------------------------
+prediction_cache = LRUTTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, name="emotion")
+
+
+def _model_dir_signature():
+    """모델 폴더의 (파일 경로, 크기, 수정 시각) + 백엔드로 만든 버전 해시"""
+    h = hashlib.sha1(f"{backend.name}::{getattr(backend, 'path', '')}".encode("utf-8"))
+    for root, _, files in sorted(os.walk(MODEL_PATH)):
+        for fn in sorted(files):
+            fp = os.path.join(root, fn)
+            try:
+                st = os.stat(fp)
+            except OSError:
+                continue
+            h.update(f"{os.path.relpath(fp, MODEL_PATH)}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def model_version():
+    """현재 프로세스가 로드한 모델의 버전 (load() 시점에 계산, 실행 중에는 바뀌지 않음)"""
+    load()
+    return _model_version
+
+
+def _cache_key(text):
+    if not CACHE_ENABLED:
+        return None
+    norm = normalize_text(text)
+    return (model_version(), norm) if norm else None
 
 
 def predict_emotion(text):
-    model.eval()
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding="max_length", max_length=128).to(DEVICE)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = F.softmax(outputs.logits, dim=1).squeeze().cpu().numpy()
-    return {label: round(prob * 100, 2) for label, prob in zip(label_names, probs)}
\ No newline at end of file
+    load()
+    key = _cache_key(text)
+    if key is not None:
+        cached = prediction_cache.get(key)
+        if cached is not MISS:
+            return dict(cached)
+
+    result = batcher(text) if BATCHING_ENABLED else _forward([text])[0]
+    if key is not None:
+        prediction_cache.set(key, result)
+    return dict(result)
+
+
+def predict_emotions(texts):
+    """여러 문장을 BATCH_MAX_SIZE 단위 forward로 분류 (캐시 적용, 중복 제거, 입력 순서 유지)"""
+    load()
+    results = [None] * len(texts)
+    todo = {}  # 캐시 키(없으면 원문) -> (원문, 캐시 키, 인덱스 목록)
+    for i, text in enumerate(texts):
+        key = _cache_key(text)
+        if key is not None:
+            cached = prediction_cache.get(key)
+            if cached is not MISS:
+                results[i] = dict(cached)
+                continue
+        todo.setdefault(key if key is not None else ("raw", text), (text, key, []))[2].append(i)
+
+    pending = list(todo.values())
+    for start in range(0, len(pending), BATCH_MAX_SIZE):
+        chunk = pending[start:start + BATCH_MAX_SIZE]
+        for (text, key, idxs), result in zip(chunk, _forward([c[0] for c in chunk])):
+            if key is not None:
+                prediction_cache.set(key, result)
+            for i in idxs:
+                results[i] = dict(result)
+    return results
+
+
+def batch_stats():
+    return {"enabled": BATCHING_ENABLED, "backend": backend.name if backend else None, **batcher.stats()}
+
+
+def cache_stats():
+    return {
+        "enabled": CACHE_ENABLED,
+        "model_version": (_model_version or "")[:12],
+        **prediction_cache.stats(),
+    }
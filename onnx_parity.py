@@ -0,0 +1,65 @@
+# onnx_parity.py
+# ONNX(양자화) 백엔드가 PyTorch 백엔드와 같은 결과를 내는지 검증
+#   - top 라벨 일치율
+#   - 라벨별 확률 차이(퍼센트 포인트)의 최대/평균
+# 사용법: python onnx_parity.py --sentences heldout.txt [--onnx model/onnx/model.int8.onnx]
+# 기준 미달이면 종료 코드 1
+import argparse
+import sys
+
+import numpy as np
+
+import model as emotion_model
+
+
+def read_sentences(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [ln.strip() for ln in f if ln.strip()]
+
+
+def run(backend, sentences, batch_size):
+    out = []
+    for i in range(0, len(sentences), batch_size):
+        out.append(emotion_model.predict_probs(sentences[i:i + batch_size], using=backend))
+    return np.concatenate(out) * 100
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sentences", required=True, help="한 줄에 한 문장인 held-out 파일")
+    ap.add_argument("--onnx", default=emotion_model.ONNX_PATH)
+    ap.add_argument("--batch-size", type=int, default=16)
+    ap.add_argument("--min-agreement", type=float, default=99.0, help="top 라벨 일치율 하한(%%)")
+    ap.add_argument("--max-drift", type=float, default=5.0, help="확률 차이 상한(%%p)")
+    args = ap.parse_args()
+
+    sentences = read_sentences(args.sentences)
+    if not sentences:
+        sys.exit(f"문장이 없습니다: {args.sentences}")
+
+    emotion_model.load()
+    ref = run(emotion_model.TorchBackend(), sentences, args.batch_size)
+    cand = run(emotion_model.OnnxBackend(args.onnx), sentences, args.batch_size)
+
+    agree = (ref.argmax(axis=1) == cand.argmax(axis=1))
+    drift = np.abs(ref - cand)
+    agreement = float(agree.mean() * 100)
+    max_drift = float(drift.max())
+
+    print(f"문장 수           : {len(sentences)}")
+    print(f"top 라벨 일치율   : {agreement:.2f}% ({int(agree.sum())}/{len(sentences)})")
+    print(f"최대 확률 차이    : {max_drift:.3f}%p")
+    print(f"평균 확률 차이    : {float(drift.mean()):.3f}%p")
+
+    labels = emotion_model.label_names
+    for i in np.where(~agree)[0][:10]:
+        print(f"  ✗ {sentences[i][:40]!r}: torch={labels[ref[i].argmax()]} onnx={labels[cand[i].argmax()]}")
+
+    if agreement < args.min_agreement or max_drift > args.max_drift:
+        print("❌ parity 기준 미달")
+        sys.exit(1)
+    print("✅ parity 통과")
+
+
+if __name__ == "__main__":
+    main()
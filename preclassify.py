@@ -0,0 +1,123 @@
+# preclassify.py
+# 감정 모델 호출 전에 적용하는 규칙 단계
+#
+# 규칙 파일(JSON, 기본 preclassify_rules.json)은 서버 시작 시 한 번 읽어
+# 모든 규칙을 하나의 정규식으로 컴파일한다. 문장당 검색은 한 번이다.
+#
+#   {"rules": [
+#     {"name": "laughter_only", "action": "skip", "match": "full", "regex": ["[ㅋㅎ]+"]},
+#     {"name": "neutral_keywords", "action": "skip", "match": "contains", "literals": ["고마워", "ㅋㅋ"]},
+#     {"name": "force_joy", "action": "label", "label": "기쁨", "match": "full", "literals": ["신난다"]}
+#   ]}
+#
+#   action : skip  → 모델을 돌리지 않고 대화 로그만 저장
+#            label → 모델 없이 해당 라벨 100% 로 처리
+#   match  : full     → 문장 전체(앞뒤 공백 제외)가 패턴과 일치
+#            contains → 문장 안에 패턴이 포함
+#
+# full 규칙이 먼저 검사되고, contains 규칙은 문장에서 가장 앞에 나온 매치가 적용된다.
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+RULES_PATH = os.getenv("PRECLASSIFY_RULES", "preclassify_rules.json")
+
+ACTIONS = ("skip", "label")
+MATCH_MODES = ("full", "contains")
+
+
+class Rule:
+    def __init__(self, name, action, match="contains", literals=None, regex=None, label=None):
+        if action not in ACTIONS:
+            raise ValueError(f"[{name}] action 은 {ACTIONS} 중 하나여야 합니다: {action}")
+        if match not in MATCH_MODES:
+            raise ValueError(f"[{name}] match 는 {MATCH_MODES} 중 하나여야 합니다: {match}")
+        if action == "label" and not label:
+            raise ValueError(f"[{name}] action=label 에는 label 이 필요합니다.")
+        if not literals and not regex:
+            raise ValueError(f"[{name}] literals 또는 regex 가 필요합니다.")
+        self.name = name
+        self.action = action
+        self.match = match
+        self.label = label
+        # 긴 리터럴을 먼저 두어 같은 위치에서 더 긴 쪽이 매치되게 한다
+        self.patterns = [re.escape(x) for x in sorted(literals or [], key=len, reverse=True)] + list(regex or [])
+
+    def body(self):
+        alt = "|".join(self.patterns)
+        if self.match == "full":
+            return rf"\A\s*(?:{alt})\s*\Z"
+        return f"(?:{alt})"
+
+
+class RuleSet:
+    def __init__(self, rules):
+        names = [r.name for r in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("규칙 이름이 중복되었습니다.")
+        # full 규칙을 앞에 두어 문장 시작 위치에서 우선 적용
+        self.rules = [r for r in rules if r.match == "full"] + [r for r in rules if r.match == "contains"]
+        self._regex = None
+        if self.rules:
+            self._regex = re.compile(
+                "|".join(f"(?P<r{i}>{r.body()})" for i, r in enumerate(self.rules)),
+                re.IGNORECASE,
+            )
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._checked = 0
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([Rule(**r) for r in data.get("rules", [])])
+
+    def label_rules(self):
+        return [r for r in self.rules if r.action == "label"]
+
+    def check_labels(self, label_names):
+        """action=label 규칙의 라벨이 모두 모델 라벨에 있는지 확인 (서버 시작 시 한 번, 없으면 ValueError)"""
+        known = set(label_names)
+        bad = [f"{r.name}={r.label}" for r in self.label_rules() if r.label not in known]
+        if bad:
+            raise ValueError(f"모델에 없는 라벨을 쓰는 규칙: {', '.join(bad)} (모델 라벨: {sorted(map(str, known))})")
+
+    def match(self, text):
+        """첫 번째로 적용되는 규칙(없으면 None)"""
+        with self._lock:
+            self._checked += 1
+        if not text or self._regex is None:
+            return None
+        m = self._regex.search(text)
+        if not m:
+            return None
+        rule = self.rules[int(m.lastgroup[1:])]
+        with self._lock:
+            self._hits[rule.name] += 1
+        return rule
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = {r.name: self._hits[r.name] for r in self.rules}
+            checked = self._checked
+        saved = sum(hits.values())
+        return {
+            "rules": len(self.rules),
+            "checked": checked,
+            "model_calls_saved": saved,
+            "saved_ratio": round(saved / checked, 4) if checked else None,
+            "hits": hits,
+        }
+
+
+def forced_result(label, label_names):
+    """action=label 규칙용 결과: 해당 라벨 100%, 나머지 0%"""
+    if label not in set(label_names):
+        raise ValueError(f"모델에 없는 라벨입니다: {label}")
+    return {name: (100.0 if name == label else 0.0) for name in label_names}
+
+
+rules = RuleSet.from_file()
@@ -0,0 +1,88 @@
+# rag_fallback.py
+# LLM 이 시간 안에 답하지 못했을 때 쓰는 추출식 답변
+# rag_data/{카테고리}_{대처방안|신고처|예방팁}.txt 의 번호 항목과 검색된 조각만으로
+# generate_json 과 같은 스키마를 만든다 (같은 입력이면 항상 같은 결과).
+import os
+import re
+from functools import lru_cache
+
+RAG_DATA_DIR = "rag_data"
+DISCLAIMER = "본 내용은 법률/투자 자문이 아닙니다. 긴급 상황은 112/금융회사 공식채널로 연락하세요."
+
+_NUMBERED = re.compile(r"^\d+\.\s*(.+)$")
+_FIELD = re.compile(r"^(연락처|문의전화|전화|웹사이트|홈페이지|신고대상|지원내용|비고)\s*:\s*(.+)$")
+_URL = re.compile(r"https?://\S+")
+
+
+def load_section_items(category: str, section: str) -> list[str]:
+    """rag_data/{category}_{section}.txt 를 라인 단위 체크 항목으로 변환"""
+    path = os.path.join(RAG_DATA_DIR, f"{category}_{section}.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [ln.strip("-·• ").strip() for ln in f.read().splitlines()]
+    # 빈 줄 제거
+    return [ln for ln in lines if ln]
+
+
+@lru_cache(maxsize=256)
+def numbered_blocks(category: str, section: str) -> tuple:
+    """번호 항목별 ((제목, (세부 줄, ...)), ...)"""
+    blocks = []
+    for line in load_section_items(category, section):
+        m = _NUMBERED.match(line)
+        if m:
+            blocks.append((m.group(1).strip(), []))
+        elif blocks:
+            blocks[-1][1].append(line)
+    return tuple((title, tuple(details)) for title, details in blocks)
+
+
+def _report_channels(category: str, limit: int = 5) -> list:
+    channels = []
+    for name, details in numbered_blocks(category, "신고처")[:limit]:
+        fields = {}
+        for line in details:
+            m = _FIELD.match(line)
+            if m and m.group(1) not in fields:
+                fields[m.group(1)] = m.group(2).strip()
+        phone = fields.get("연락처") or fields.get("문의전화") or fields.get("전화")
+        web = fields.get("웹사이트") or fields.get("홈페이지")
+        if phone:
+            channel = {"name": name, "type": "전화", "value": re.sub(r"^전화\s*", "", phone)}
+        elif web:
+            url = _URL.search(web)
+            channel = {"name": name, "type": "웹", "value": url.group(0) if url else web}
+        else:
+            continue
+        channel["note"] = fields.get("신고대상") or fields.get("지원내용") or fields.get("비고") or ""
+        channels.append(channel)
+    return channels
+
+
+def extractive_answer(category: str, section: str, chunks) -> dict:
+    """
+    chunks: RAGEngine.retrieve_chunks 결과 [(문서 조각, 메타데이터), ...]
+    대처방안 앞 3개 → immediate_actions, 나머지 → next_steps, 예방팁 → prevention_tips, 신고처 → where_to_report
+    """
+    actions = [title for title, _ in numbered_blocks(category, "대처방안")]
+    if not actions:
+        # 섹션 파일이 없으면 검색된 조각의 첫 줄을 대신 사용
+        actions = [d.strip().splitlines()[0] for d, _ in chunks if d and d.strip()]
+
+    sources = []
+    for _, meta in chunks:
+        src = meta.get("source", "")
+        if src and src not in sources:
+            sources.append(src)
+
+    return {
+        "category": category,
+        "section": section,
+        "immediate_actions": actions[:3],
+        "next_steps": actions[3:8],
+        "prevention_tips": [title for title, _ in numbered_blocks(category, "예방팁")][:5],
+        "where_to_report": _report_channels(category),
+        "source_citations": [{"title": src, "url": ""} for src in sources],
+        "disclaimer": DISCLAIMER,
+    }
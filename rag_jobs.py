@@ -0,0 +1,125 @@
+# rag_jobs.py
+# 비동기 /rag/advise 작업 상태 저장소 (SQLite)
+# gunicorn 워커가 여러 개여도 작업을 만든 워커와 조회하는 워커가 같은 파일을 본다.
+#
+#   RAG_JOBS_PATH : SQLite 파일 (기본 rag_store/rag_jobs.sqlite3)
+#   RAG_JOBS_TTL  : 끝난 작업을 남겨 두는 시간(초)
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOBS_PATH = os.getenv("RAG_JOBS_PATH", os.path.join("rag_store", "rag_jobs.sqlite3"))
+JOBS_TTL = float(os.getenv("RAG_JOBS_TTL", "3600"))
+PURGE_EVERY = 100  # 작업 N개를 만들 때마다 오래된 작업 정리
+
+
+class JobStore:
+    def __init__(self, path=JOBS_PATH, ttl=JOBS_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._created = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            with self._lock:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS rag_jobs (
+                        id          TEXT PRIMARY KEY,
+                        status      TEXT NOT NULL,
+                        created_at  REAL NOT NULL,
+                        started_at  REAL,
+                        finished_at REAL,
+                        result      TEXT,
+                        error       TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_rag_jobs_created_at ON rag_jobs (created_at)")
+                # started_at 이 없던 이전 파일
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(rag_jobs)")}
+                if "started_at" not in columns:
+                    conn.execute("ALTER TABLE rag_jobs ADD COLUMN started_at REAL")
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def create(self) -> str:
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO rag_jobs (id, status, created_at) VALUES (?, 'pending', ?)", (job_id, time.time())
+        )
+        with self._lock:
+            self._created += 1
+            purge = self._created % PURGE_EVERY == 0
+        if purge:
+            self.purge()
+        return job_id
+
+    def start(self, job_id):
+        self._conn().execute(
+            "UPDATE rag_jobs SET started_at = ? WHERE id = ? AND status = 'pending'", (time.time(), job_id)
+        )
+
+    def finish(self, job_id, result: dict):
+        self._conn().execute(
+            "UPDATE rag_jobs SET status = 'done', finished_at = ?, result = ? WHERE id = ?",
+            (time.time(), json.dumps(result, ensure_ascii=False), job_id),
+        )
+
+    def fail(self, job_id, message: str):
+        self._conn().execute(
+            "UPDATE rag_jobs SET status = 'error', finished_at = ?, error = ? WHERE id = ?",
+            (time.time(), message, job_id),
+        )
+
+    def abandon_stale(self, job_id, run_timeout: float, queue_timeout: float, message: str) -> bool:
+        """
+        실행을 시작한 지 run_timeout 초, 또는 만든 지 queue_timeout 초가 지나도 pending 이면 error 로 바꾼다
+        (작업을 처리하던 워커가 종료된 경우). 바꿨으면 True
+        """
+        now = time.time()
+        return self._conn().execute("""
+            UPDATE rag_jobs SET status = 'error', finished_at = ?, error = ?
+             WHERE id = ? AND status = 'pending'
+               AND ((started_at IS NOT NULL AND started_at <= ?)
+                 OR (started_at IS NULL AND created_at <= ?))
+        """, (now, message, job_id, now - run_timeout, now - queue_timeout)).rowcount > 0
+
+    def get(self, job_id):
+        """{id, status, created_at, started_at, finished_at, result, error} 또는 None"""
+        row = self._conn().execute(
+            "SELECT id, status, created_at, started_at, finished_at, result, error FROM rag_jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "started_at": row[3],
+            "finished_at": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+        }
+
+    def purge(self):
+        return self._conn().execute(
+            "DELETE FROM rag_jobs WHERE created_at <= ?", (time.time() - self.ttl,)
+        ).rowcount
+
+
+job_store = JobStore()
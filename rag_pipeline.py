@@ -1,16 +1,133 @@
 # rag_pipeline.py
 import os, json
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import math
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
 from typing import Optional
-from openai import OpenAI
+from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError
 from dotenv import load_dotenv
+from batching import MicroBatcher
+from cache_utils import MISS, LRUTTLCache, normalize_text
+from llm_cache import llm_cache, prompt_key
+from rag_fallback import extractive_answer
+from singleflight import SingleFlight
 load_dotenv()
-client = OpenAI()
+
+logger = logging.getLogger(__name__)
 
 PERSIST_DIR = "rag_store"
 EMB_MODEL = "jhgan/ko-sroberta-multitask"
+LLM_MODEL = "gpt-4o-mini"
+LLM_TEMPERATURE = 0.2
+
+# LLM 지연 예산
+#   RAG_LLM_DEADLINE_S    : 요청당 마감(초). 넘기면 추출식 답변 (rag_fallback.py) 으로 대체
+#   RAG_LLM_RETRIES       : 일시적 오류(연결/타임아웃/429/5xx) 재시도 횟수
+#   RAG_LLM_BACKOFF_S     : 첫 재시도 대기(초), 이후 2배씩 + 지터
+#   RAG_LLM_HEDGE_AFTER_S : 이 시간(초) 안에 응답이 없으면 같은 요청을 한 번 더 보냄 (0 = 끄기)
+#   RAG_LLM_POOL_SIZE     : LLM 호출 스레드 수
+LLM_DEADLINE_S = float(os.getenv("RAG_LLM_DEADLINE_S", "10"))
+LLM_RETRIES = int(os.getenv("RAG_LLM_RETRIES", "2"))
+LLM_BACKOFF_S = float(os.getenv("RAG_LLM_BACKOFF_S", "0.25"))
+LLM_HEDGE_AFTER_S = float(os.getenv("RAG_LLM_HEDGE_AFTER_S", "4"))
+LLM_POOL_SIZE = int(os.getenv("RAG_LLM_POOL_SIZE", "16"))
+_RETRYABLE = (APIConnectionError, RateLimitError, InternalServerError)  # APITimeoutError 포함
+
+# LLM 동시성 (워커 프로세스당)
+#   RAG_LLM_MAX_INFLIGHT     : 동시에 진행 중인 LLM 호출 상한 (세마포어). 자리가 날 때까지 마감 안에서 대기
+#   RAG_HTTP_MAX_CONNECTIONS : OpenAI 호출용 keep-alive 커넥션 풀 크기
+#   RAG_HTTP_KEEPALIVE_S     : 쉬는 커넥션 유지 시간(초)
+#   RAG_JOB_WORKERS          : 비동기 /rag/advise 작업(검색 + 생성)을 돌리는 스레드 수
+#   RAG_JOB_QUEUE_MAX        : 대기 + 진행 중 작업 상한. 넘으면 새 작업은 거절(503)
+#   RAG_JOB_DEADLINE_S       : 비동기 작업의 지연 예산(초). 큐 대기는 빼고 작업이 실행을 시작한 시점부터 센다
+# OpenAI 호환 목 서버로 시험할 때는 OPENAI_BASE_URL=http://127.0.0.1:8089/v1 (mock_openai_server.py)
+LLM_MAX_INFLIGHT = int(os.getenv("RAG_LLM_MAX_INFLIGHT", "8"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("RAG_HTTP_MAX_CONNECTIONS", "32"))
+HTTP_KEEPALIVE_S = float(os.getenv("RAG_HTTP_KEEPALIVE_S", "60"))
+JOB_WORKERS = int(os.getenv("RAG_JOB_WORKERS", "32"))
+JOB_QUEUE_MAX = int(os.getenv("RAG_JOB_QUEUE_MAX", "256"))
+JOB_DEADLINE_S = float(os.getenv("RAG_JOB_DEADLINE_S", "60"))
+# 이 시간이 지나도 pending 인 작업은 처리하던 워커가 죽은 것으로 본다
+#   실행 중: 예산 + 여유 / 대기 중: 큐가 가득 찬 상태에서 차례가 올 때까지의 최대 시간
+JOB_STALE_GRACE_S = 30
+JOB_RUN_TIMEOUT_S = JOB_DEADLINE_S + JOB_STALE_GRACE_S
+JOB_QUEUE_TIMEOUT_S = JOB_RUN_TIMEOUT_S * math.ceil(JOB_QUEUE_MAX / max(1, JOB_WORKERS))
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+# OpenAI 클라이언트는 처음 쓸 때 생성 (fork 된 워커는 자기 커넥션 풀로 새로 생성)
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                import httpx  # openai 의존성
+
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_S,
+                    ),
+                    timeout=httpx.Timeout(LLM_DEADLINE_S, connect=5.0),
+                )
+                _client = OpenAI(http_client=http_client)
+                _client_pid = os.getpid()
+    return _client
+
+
+def client_ready() -> bool:
+    return _client is not None
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _pool(name, max_workers) -> ThreadPoolExecutor:
+    # fork 된 워커는 자기 스레드 풀을 새로 만든다
+    key = (name, os.getpid())
+    pool = _executors.get(key)
+    if pool is None:
+        with _executors_lock:
+            pool = _executors.get(key)
+            if pool is None:
+                pool = _executors[key] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return pool
+
+
+def _llm_executor() -> ThreadPoolExecutor:
+    return _pool("llm", LLM_POOL_SIZE)
+
+
+def _job_executor() -> ThreadPoolExecutor:
+    return _pool("rag-job", JOB_WORKERS)
+
+# 질의 임베딩 캐시: (EMB_MODEL, 정규화된 질의) → 임베딩
+EMB_CACHE_ENABLED = os.getenv("RAG_EMB_CACHE", "1") == "1"
+EMB_CACHE_MAXSIZE = int(os.getenv("RAG_EMB_CACHE_MAXSIZE", "2048"))
+# 동시에 들어온 retrieve 의 encode 를 한 번에 묶어 forward
+EMB_BATCHING = os.getenv("RAG_EMB_BATCHING", "1") == "1"
+EMB_BATCH_MAX_SIZE = int(os.getenv("RAG_EMB_BATCH_MAX_SIZE", "16"))
+EMB_BATCH_MAX_WAIT_MS = float(os.getenv("RAG_EMB_BATCH_MAX_WAIT_MS", "5"))
 
 _SYSTEM = (
     "너는 한국어로 금융/생활 사기 대처 가이드를 만드는 조력자야. "
@@ -45,17 +162,121 @@ JSON만 출력하세요.
 """
 
 class RAGEngine:
+    """벡터 스토어와 임베딩 모델은 처음 쓸 때(또는 load_* 호출 시) 로드"""
+
     def __init__(self):
-        self.client = chromadb.PersistentClient(
-            path=PERSIST_DIR, settings=Settings(allow_reset=False)
+        self.client = None
+        self._coll = None
+        self._store_pid = None
+        self._emb_model = None
+        self._store_lock = threading.Lock()
+        self._emb_lock = threading.Lock()
+        self.embedding_cache = LRUTTLCache(maxsize=EMB_CACHE_MAXSIZE, name="rag_embedding")
+        self.embed_batcher = MicroBatcher(
+            self._encode_batch, max_batch_size=EMB_BATCH_MAX_SIZE,
+            max_wait_ms=EMB_BATCH_MAX_WAIT_MS, name="rag_embedding",
         )
-        self.coll = self.client.get_or_create_collection(
-            "kb_advice_v1", metadata={"hnsw:space": "cosine"}
-        )
-        self.emb_model = SentenceTransformer(EMB_MODEL)
+        # 답변 출처(llm / cache / fallback)와 LLM 호출 통계
+        self._stats_lock = threading.Lock()
+        self.answer_sources = Counter()
+        self.llm_retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+        self.llm_errors = 0
+        # 동일 요청 합치기 (검색 / 생성)
+        self.retrieve_flight = SingleFlight("rag_retrieve")
+        self.generate_flight = SingleFlight("rag_generate")
+        # 동시 LLM 호출 상한과 비동기 작업 수
+        self._llm_slots = threading.BoundedSemaphore(LLM_MAX_INFLIGHT)
+        self.inflight = 0
+        self.inflight_peak = 0
+        self.slot_waits = 0
+        self.jobs_active = 0
+        self.jobs_rejected = 0
 
-    def retrieve(self, query: str, category: str, top_k: int = 5, section: Optional[str] = None) -> str:
-        q_emb = self.emb_model.encode(query).tolist()
+    def load_store(self):
+        # Chroma PersistentClient 는 SQLite 커넥션을 들고 있으므로 fork 된 워커는 자기 클라이언트를 새로 연다
+        if self._coll is not None and self._store_pid == os.getpid():
+            return
+        with self._store_lock:
+            if self._coll is None or self._store_pid != os.getpid():
+                import chromadb
+                from chromadb.config import Settings
+
+                if self._store_pid is not None and self._store_pid != os.getpid():
+                    # 같은 경로의 System(SQLite 커넥션 포함)을 재사용하지 않도록 부모에게서 물려받은 캐시를 비움
+                    from chromadb.api.client import SharedSystemClient
+
+                    SharedSystemClient.clear_system_cache()
+                self.client = chromadb.PersistentClient(
+                    path=PERSIST_DIR, settings=Settings(allow_reset=False)
+                )
+                self._coll = self.client.get_or_create_collection(
+                    "kb_advice_v1", metadata={"hnsw:space": "cosine"}
+                )
+                self._store_pid = os.getpid()
+
+    def after_fork(self):
+        """fork 된 워커에서 호출. 마스터가 연 벡터 스토어를 워커 자기 커넥션으로 다시 연다"""
+        if self._coll is not None:
+            self.load_store()
+
+    def load_embedder(self):
+        if self._emb_model is not None:
+            return
+        with self._emb_lock:
+            if self._emb_model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._emb_model = SentenceTransformer(EMB_MODEL)
+
+    def store_ready(self) -> bool:
+        return self._coll is not None and self._store_pid == os.getpid()
+
+    def embedder_ready(self) -> bool:
+        return self._emb_model is not None
+
+    def warmup_embedder(self):
+        self.emb_model.encode("워밍업용 문장입니다.")
+
+    @property
+    def coll(self):
+        self.load_store()
+        return self._coll
+
+    @property
+    def emb_model(self):
+        self.load_embedder()
+        return self._emb_model
+
+    def _encode_batch(self, texts):
+        return [vec.tolist() for vec in self.emb_model.encode(texts, batch_size=len(texts))]
+
+    def embed_query(self, query: str) -> list:
+        """캐시에 있으면 그대로, 없으면 (배처를 거쳐) encode 후 저장"""
+        text = normalize_text(query, strip_punct=False)
+        key = (EMB_MODEL, text)
+        if EMB_CACHE_ENABLED:
+            cached = self.embedding_cache.get(key)
+            if cached is not MISS:
+                return cached
+
+        emb = self.embed_batcher(text) if EMB_BATCHING else self._encode_batch([text])[0]
+        if EMB_CACHE_ENABLED:
+            self.embedding_cache.set(key, emb)
+        return emb
+
+    def embedding_stats(self) -> dict:
+        return {
+            "model": EMB_MODEL,
+            "cache": {"enabled": EMB_CACHE_ENABLED, **self.embedding_cache.stats()},
+            "batcher": {"enabled": EMB_BATCHING, **self.embed_batcher.stats()},
+        }
+
+    def retrieve_chunks(self, query: str, category: str, top_k: int = 5, section: Optional[str] = None) -> list:
+        """[(문서 조각, 메타데이터), ...] 유사도 순"""
+        q_emb = self.embed_query(query)
 
         if section:
             where = {"$and": [
@@ -72,53 +293,303 @@ class RAGEngine:
         )
         docs = res.get("documents", [[]])[0]
         metas = res.get("metadatas", [[]])[0]
+        return [(d, m or {}) for d, m in zip(docs, metas)]
 
-        if not docs:
-            return "- 관련 문서를 찾지 못했습니다."
-
-        lines = []
-        for d, m in zip(docs, metas):
-            src = (m or {}).get("source", "")
-            lines.append(f"- {d}\n(출처: {src})")
-        return "\n\n".join(lines)
+    def retrieve(self, query: str, category: str, top_k: int = 5, section: Optional[str] = None) -> str:
+        return format_context(self.retrieve_chunks(query, category, top_k=top_k, section=section))
 
-    def generate_json(self, case_summary: str, category: str, context: str, section: str) -> dict:
+    def _messages(self, case_summary: str, category: str, context: str, section: str):
         prompt = _TEMPLATE.format(
             case_summary=case_summary, category=category, context=context, section=section
         )
+        messages = [
+            {"role": "system", "content": _SYSTEM},
+            {"role": "user", "content": prompt},
+        ]
+        return messages, prompt_key(LLM_MODEL, LLM_TEMPERATURE, _SYSTEM, prompt)
 
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": _SYSTEM},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.2,
-        )
+    # ------------------------------------------------------
+    # LLM 호출: 요청 마감 시각(deadline) 안에서 재시도 + 헤징
+    # ------------------------------------------------------
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    @contextmanager
+    def _llm_slot(self, deadline):
+        """동시 LLM 호출을 LLM_MAX_INFLIGHT 개로 제한. 마감까지 자리가 안 나면 LLMDeadlineExceeded"""
+        if not self._llm_slots.acquire(blocking=False):
+            self._count("slot_waits")
+            if not self._llm_slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMDeadlineExceeded()
+        with self._stats_lock:
+            self.inflight += 1
+            self.inflight_peak = max(self.inflight_peak, self.inflight)
+        try:
+            yield
+        finally:
+            with self._stats_lock:
+                self.inflight -= 1
+            self._llm_slots.release()
 
-        text = (resp.choices[0].message.content or "").strip()
+    def _call_once(self, messages, deadline):
+        with self._llm_slot(deadline):
+            # SDK 자체 재시도는 끄고, 남은 시간만큼만 기다린다
+            timeout = max(0.1, deadline - time.monotonic())
+            resp = get_client().with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=LLM_TEMPERATURE,
+            )
+            return resp.choices[0].message.content
 
-        # JSON 파싱 안전장치
-        start, end = text.find("{"), text.rfind("}")
-        if start != -1 and end != -1:
-            text = text[start:end+1]
+    def _hedged_call(self, messages, deadline):
+        """첫 호출이 LLM_HEDGE_AFTER_S 안에 끝나지 않으면 같은 요청을 하나 더 보내 먼저 온 응답 사용"""
+        pool = _llm_executor()
+        first = pool.submit(self._call_once, messages, deadline)
+        pending = {first}
+        hedge_at = time.monotonic() + LLM_HEDGE_AFTER_S if LLM_HEDGE_AFTER_S > 0 else None
+        error = None
+        while pending:
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is not first:
+                        self._count("hedge_wins")
+                    return f.result()
+                error = f.exception()
+            if time.monotonic() >= deadline:
+                raise LLMDeadlineExceeded()
+            if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                pending.add(pool.submit(self._call_once, messages, deadline))
+                hedge_at = None
+                self._count("hedges")
+        raise error
 
+    def _complete(self, messages, deadline):
+        """일시적 오류는 지수 백오프(+지터)로 LLM_RETRIES 번까지 재시도. 마감을 넘기면 LLMDeadlineExceeded"""
+        attempt = 0
+        while True:
+            if time.monotonic() >= deadline:
+                raise LLMDeadlineExceeded()
+            try:
+                return self._hedged_call(messages, deadline)
+            except _RETRYABLE:
+                attempt += 1
+                delay = LLM_BACKOFF_S * (2 ** (attempt - 1)) * (0.5 + random.random())
+                if attempt > LLM_RETRIES or time.monotonic() + delay >= deadline:
+                    raise
+                self._count("llm_retries")
+                time.sleep(delay)
+
+    def _fallback(self, category, section, chunks, error):
+        if isinstance(error, (LLMDeadlineExceeded, APITimeoutError, FuturesTimeoutError)):
+            reason = "deadline"
+            self._count("deadline_misses")
+            logger.warning("LLM 응답이 마감 시간을 넘겨 추출식 답변으로 대체 (%s/%s)", category, section)
+        else:
+            reason = "error"
+            self._count("llm_errors")
+            logger.warning("LLM 호출 실패 → 추출식 답변으로 대체 (%s/%s): %r", category, section, error)
+        self._record_source("fallback")
+        result = extractive_answer(category, section, chunks or ())
+        result["_degraded"] = True
+        result["_degraded_reason"] = reason
+        return result
+
+    def _record_source(self, source):
+        with self._stats_lock:
+            self.answer_sources[source] += 1
+
+    def generate_json(self, case_summary: str, category: str, context: str, section: str,
+                      deadline: Optional[float] = None, chunks=None) -> dict:
+        """
+        deadline: time.monotonic() 기준 마감 시각 (기본: 지금 + LLM_DEADLINE_S)
+        chunks  : retrieve_chunks 결과. LLM 이 마감을 넘기거나 실패하면 이것과 rag_data 섹션 파일로
+                  추출식 답변을 만들어 "_degraded": true 로 반환
+        """
+        messages, key = self._messages(case_summary, category, context, section)
+
+        # 같은 프롬프트/모델/temperature 면 디스크 캐시 응답 사용
+        cached = llm_cache.get(key)
+        if cached is not None:
+            self._record_source("cache")
+            return cached
+
+        deadline = deadline or time.monotonic() + LLM_DEADLINE_S
+
+        def call_llm():
+            t0 = time.perf_counter()
+            content = self._complete(messages, deadline)
+            result = parse_result(content, category, section)
+            llm_cache.set(key, result, time.perf_counter() - t0)  # "_raw" 응답은 기본적으로 저장하지 않음
+            return result
+
+        # 같은 프롬프트가 이미 생성 중이면 그 결과를 (내 마감까지) 기다린다.
+        # 리더가 자기 마감에 걸려 끝나면 공유하지 않고, 시간이 남은 호출이 새 리더로 다시 시도
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # 최소 형태로라도 반환해 UI가 죽지 않게
+            result = self.generate_flight.do(key, call_llm, timeout=max(0.0, deadline - time.monotonic()),
+                                             retry_on=(LLMDeadlineExceeded, APITimeoutError))
+        except Exception as e:
+            return self._fallback(category, section, chunks, e)
+
+        self._record_source("llm")
+        return result
+
+    def generate_stream(self, case_summary: str, category: str, context: str, section: str,
+                        deadline: Optional[float] = None, chunks=None):
+        """
+        generate_json 의 스트리밍 버전. ("token", 조각) 을 받는 대로 내보내고
+        마지막에 ("result", generate_json 과 같은 스키마/폴백의 dict) 를 내보낸다.
+        캐시 적중이면 토큰 없이 바로 result. 마감을 넘기거나 실패하면 추출식 답변으로 끝낸다.
+        (토큰이 이미 나간 뒤라 재시도/헤징은 하지 않는다)
+        """
+        messages, key = self._messages(case_summary, category, context, section)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            self._record_source("cache")
+            yield "result", cached
+            return
+
+        deadline = deadline or time.monotonic() + LLM_DEADLINE_S
+        t0 = time.perf_counter()
+        parts = []
+        try:
+            with self._llm_slot(deadline):
+                stream = get_client().with_options(
+                    timeout=max(0.1, deadline - time.monotonic()), max_retries=0,
+                ).chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=LLM_TEMPERATURE,
+                    stream=True,
+                )
+                for chunk in stream:
+                    if time.monotonic() >= deadline:
+                        stream.close()
+                        raise LLMDeadlineExceeded()
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield "token", delta
+        except Exception as e:
+            yield "result", self._fallback(category, section, chunks, e)
+            return
+        latency = time.perf_counter() - t0
+
+        self._record_source("llm")
+        result = parse_result("".join(parts), category, section)
+        llm_cache.set(key, result, latency)
+        yield "result", result
+
+    # ------------------------------------------------------
+    # 검색 + 생성 (동기 / 비동기 작업)
+    # ------------------------------------------------------
+    def retrieve_case(self, case_summary: str, category: str, section: str, top_k: int = 5) -> list:
+        """retrieve_chunks 와 같지만, 같은 (카테고리, 섹션, 요약) 검색이 진행 중이면 그 결과에 합류"""
+        flight_key = (EMB_MODEL, category, section, top_k, normalize_text(case_summary, strip_punct=False))
+        return self.retrieve_flight.do(
+            flight_key, lambda: self.retrieve_chunks(query=case_summary, category=category, section=section, top_k=top_k))
+
+    def advise(self, case_summary: str, category: str, section: str, deadline: Optional[float] = None) -> dict:
+        chunks  = self.retrieve_case(case_summary, category, section)
+        context = format_context(chunks)
+        return self.generate_json(case_summary=case_summary, category=category, context=context,
+                                  section=section, deadline=deadline, chunks=chunks)
+
+    def submit_advise(self, case_summary: str, category: str, section: str,
+                      budget: float = JOB_DEADLINE_S, on_start=None):
+        """
+        advise 를 작업 스레드 풀에서 실행하고 Future 반환. 작업이 JOB_QUEUE_MAX 개면 JobQueueFull
+        budget(초)은 작업이 실행을 시작할 때부터 센다 (큐 대기 시간은 포함하지 않음)
+        """
+        with self._stats_lock:
+            if self.jobs_active >= JOB_QUEUE_MAX:
+                self.jobs_rejected += 1
+                raise JobQueueFull(f"대기 중인 RAG 작업이 {JOB_QUEUE_MAX}개를 넘었습니다.")
+            self.jobs_active += 1
+
+        def run():
+            deadline = time.monotonic() + budget
+            if on_start is not None:
+                try:
+                    on_start()
+                except Exception:
+                    logger.exception("RAG 작업 시작 기록 실패")
+            return self.advise(case_summary, category, section, deadline=deadline)
+
+        future = _job_executor().submit(run)
+        future.add_done_callback(lambda _: self._count("jobs_active", -1))
+        return future
+
+    def singleflight_stats(self) -> dict:
+        return {"retrieve": self.retrieve_flight.stats(), "generate": self.generate_flight.stats()}
+
+    def answer_stats(self) -> dict:
+        with self._stats_lock:
+            total = sum(self.answer_sources.values())
             return {
-                "category": category,
-                "section": section,
-                "immediate_actions": [],
-                "next_steps": [],
-                "prevention_tips": [],
-                "where_to_report": [],
-                "source_citations": [],
-                "disclaimer": "본 내용은 법률/투자 자문이 아닙니다. 긴급 상황은 112/금융회사 공식채널로 연락하세요.",
-                "_raw": text,  # 디버깅용
+                "sources": dict(self.answer_sources),
+                "ratio": {k: round(v / total, 4) for k, v in self.answer_sources.items()} if total else {},
+                "deadline_s": LLM_DEADLINE_S,
+                "job_deadline_s": JOB_DEADLINE_S,
+                "retries": self.llm_retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "deadline_misses": self.deadline_misses,
+                "errors": self.llm_errors,
+                "inflight": self.inflight,
+                "inflight_peak": self.inflight_peak,
+                "max_inflight": LLM_MAX_INFLIGHT,
+                "slot_waits": self.slot_waits,
+                "jobs_active": self.jobs_active,
+                "jobs_rejected": self.jobs_rejected,
             }
 
 
+def format_context(chunks) -> str:
+    if not chunks:
+        return "- 관련 문서를 찾지 못했습니다."
+
+    lines = []
+    for d, m in chunks:
+        src = m.get("source", "")
+        lines.append(f"- {d}\n(출처: {src})")
+    return "\n\n".join(lines)
+
+
+def chunk_sources(chunks) -> list:
+    """응답에 붙일 근거 목록 (출처 파일, 섹션)"""
+    return [{"source": m.get("source", ""), "section": m.get("section", ""), "text": d} for d, m in chunks]
+
+
+def parse_result(text: Optional[str], category: str, section: str) -> dict:
+    text = (text or "").strip()
+
+    # JSON 파싱 안전장치
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end != -1:
+        text = text[start:end+1]
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # 최소 형태로라도 반환해 UI가 죽지 않게
+        return {
+            "category": category,
+            "section": section,
+            "immediate_actions": [],
+            "next_steps": [],
+            "prevention_tips": [],
+            "where_to_report": [],
+            "source_citations": [],
+            "disclaimer": "본 내용은 법률/투자 자문이 아닙니다. 긴급 상황은 112/금융회사 공식채널로 연락하세요.",
+            "_raw": text,  # 디버깅용
+        }
+
+
 rag_engine = RAGEngine()
 
@@ -0,0 +1,91 @@
+# readiness.py
+# 무거운 리소스(모델, 임베더, 벡터 스토어, API 클라이언트)의 병렬 로딩과 준비 상태 관리
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class Component:
+    def __init__(self, name, load, is_ready, warmup=None):
+        self.name = name
+        self.load = load
+        self.is_ready = is_ready
+        self.warmup = warmup
+        self.state = "pending"  # pending | loading | warming | ready | failed
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.error = None
+
+
+class Registry:
+    def __init__(self):
+        self._components = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def register(self, name, load, is_ready, warmup=None):
+        self._components[name] = Component(name, load, is_ready, warmup)
+
+    def _start_one(self, comp, warmup):
+        with self._lock:
+            if comp.state in ("loading", "warming", "ready"):
+                return
+            comp.state = "loading"
+        try:
+            t0 = time.perf_counter()
+            comp.load()
+            comp.load_seconds = round(time.perf_counter() - t0, 3)
+            logger.info("[startup] %s 로드 %.2fs", comp.name, comp.load_seconds)
+
+            if warmup and comp.warmup:
+                comp.state = "warming"
+                t0 = time.perf_counter()
+                comp.warmup()
+                comp.warmup_seconds = round(time.perf_counter() - t0, 3)
+                logger.info("[startup] %s 워밍업 %.2fs", comp.name, comp.warmup_seconds)
+            comp.state = "ready"
+        except Exception as e:
+            comp.state = "failed"
+            comp.error = str(e)
+            logger.exception("[startup] %s 로드 실패", comp.name)
+
+    def start(self, wait: bool = False, warmup: bool = True):
+        """모든 컴포넌트를 스레드로 병렬 로드. wait=True 면 끝날 때까지 대기"""
+        comps = list(self._components.values())
+        if not comps:
+            return
+        t0 = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=len(comps), thread_name_prefix="startup")
+        futures = [self._executor.submit(self._start_one, c, warmup) for c in comps]
+        if wait:
+            for f in futures:
+                f.result()
+            logger.info("[startup] 전체 준비 %.2fs", time.perf_counter() - t0)
+        self._executor.shutdown(wait=False)
+
+    def _state_of(self, comp):
+        # 요청 처리 중 지연 로드된 경우도 준비 완료로 본다
+        if comp.state in ("pending", "loading") and comp.is_ready():
+            return "ready"
+        return comp.state
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "state": self._state_of(c),
+                "load_seconds": c.load_seconds,
+                "warmup_seconds": c.warmup_seconds,
+                "error": c.error,
+            }
+            for name, c in self._components.items()
+        }
+
+    def ready(self, names=None) -> bool:
+        names = names or list(self._components)
+        return all(self._state_of(self._components[n]) == "ready" for n in names)
+
+    def __contains__(self, name):
+        return name in self._components
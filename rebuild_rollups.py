@@ -0,0 +1,65 @@
+# rebuild_rollups.py
+# emotion_summary(일별) 에서 주/월 롤업 테이블을 다시 계산
+# 사용법: python rebuild_rollups.py                     → 전체 기간
+#         python rebuild_rollups.py --since 2025-01-01  → 그 날짜가 속한 주/월부터
+#
+# 기간별로 지우고 다시 넣는 작업을 한 트랜잭션으로 처리한다.
+# INSERT ... SELECT 가 읽은 emotion_summary 행에 공유 잠금을 걸기 때문에,
+# 그 사이 들어오는 update_emotion_summary_all 은 재계산이 끝난 뒤에 누적된다.
+# 같은 트랜잭션에서 summary_rollup_state.rebuilt_at 을 갱신해 (migrations/004)
+# 실행 중인 워커의 요약 캐시도 SUMMARY_CACHE_REBUILD_CHECK_S 안에 새 값을 읽게 한다.
+import argparse
+from datetime import date, datetime
+
+import pymysql
+
+from db import MYSQL_CONFIG
+from SQL_function import month_start_of, week_start_of
+from summary_cache import summary_cache
+
+ROLLUPS = (
+    ("emotion_summary_weekly", "week_start", "date - INTERVAL WEEKDAY(date) DAY", week_start_of),
+    ("emotion_summary_monthly", "month_start", "date - INTERVAL (DAYOFMONTH(date) - 1) DAY", month_start_of),
+)
+
+
+def rebuild(cur, since: date):
+    for table, column, period_expr, period_of in ROLLUPS:
+        start = period_of(since)
+        cur.execute(f"DELETE FROM {table} WHERE {column} >= %s", (start,))
+        deleted = cur.rowcount
+        cur.execute(f"""
+            INSERT INTO {table} ({column}, emotion, total_confidence, count)
+            SELECT {period_expr}, emotion, SUM(total_confidence), SUM(count)
+              FROM emotion_summary
+             WHERE date >= %s
+             GROUP BY {period_expr}, emotion
+        """, (start,))
+        print(f"✅ {table}: {start} 이후 {deleted}행 삭제, {cur.rowcount}행 재계산")
+    # app 과 같은 로컬 시각 기준 (Last-Modified 로도 쓰임)
+    cur.execute("""
+        INSERT INTO summary_rollup_state (id, rebuilt_at) VALUES (1, %s)
+        ON DUPLICATE KEY UPDATE rebuilt_at = VALUES(rebuilt_at)
+    """, (datetime.now(),))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--since", help="YYYY-MM-DD (기본: 전체 기간)")
+    args = ap.parse_args()
+    since = datetime.strptime(args.since, "%Y-%m-%d").date() if args.since else date(1970, 1, 1)
+
+    # 전체 재계산은 오래 걸릴 수 있으므로 풀 대신 읽기/쓰기 타임아웃 없는 전용 커넥션 사용
+    conn = pymysql.connect(**{**MYSQL_CONFIG, "read_timeout": None, "write_timeout": None})
+    try:
+        with conn.cursor() as cur:
+            rebuild(cur, since)
+        conn.commit()
+    finally:
+        conn.close()
+    # 공유(redis) 요약 캐시를 쓰면 지운다. 워커의 프로세스 내 캐시는 rebuilt_at 이 바뀐 것을 보고 새 키로 읽는다
+    summary_cache.clear()
+
+
+if __name__ == "__main__":
+    main()
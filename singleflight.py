@@ -0,0 +1,67 @@
+# singleflight.py
+# 같은 키의 작업이 동시에 여러 번 들어오면 첫 호출만 실행하고 나머지는 그 결과를 기다린다
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+        self.leaders = 0    # 실제로 실행한 호출
+        self.collapsed = 0  # 진행 중인 호출에 합류한 중복 호출
+        self.errors = 0
+        self.retries = 0    # 리더의 retry_on 실패 뒤 다시 시도한 합류 호출
+
+    def do(self, key, fn, timeout: float = None, retry_on=()):
+        """
+        fn() 의 결과(또는 예외)를 같은 키로 동시에 들어온 호출 모두에게 돌려준다.
+        합류한 호출은 timeout(초) 까지만 기다리고 concurrent.futures.TimeoutError 를 낸다.
+        retry_on: 리더에게만 해당하는 실패 (예: 리더의 마감 초과). 리더가 이 예외로 끝나면
+                  합류한 호출은 결과를 공유하지 않고 자기 fn 으로 다시 시도한다 (남은 timeout 안에서).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+                    self.leaders += 1
+                else:
+                    self.collapsed += 1
+
+            if leader:
+                break
+            try:
+                return future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except retry_on:
+                with self._lock:
+                    self.retries += 1
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self.errors += 1
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.leaders + self.collapsed
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "collapsed": self.collapsed,
+                "errors": self.errors,
+                "retries": self.retries,
+                "collapse_rate": round(self.collapsed / total, 4) if total else None,
+            }
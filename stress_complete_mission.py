@@ -0,0 +1,134 @@
+# stress_complete_mission.py
+# complete_mission 동시성 스트레스 테스트 (실제 MySQL 필요, 테스트용 user_id 범위의 행을 지우고 시작)
+# 사용법: python stress_complete_mission.py --users 200 --taps 8 --workers 32
+#
+# 사용자마다 같은 미션 완료를 --taps 번 동시에 보내고 다음을 확인한다.
+#   - 사용자마다 성공(True)은 정확히 1번, 나머지는 전부 "이미 완료"(False)
+#   - UserMissionStatus 는 사용자마다 오늘 한 행, is_completed = TRUE
+#   - UserCharacter 의 XP 는 한 번만 올라 (total_exp=1, level=1, next_exp_req=5)
+# 그리고 초당 처리량과 호출 지연 p50/p95/p99 를 출력한다.
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from db import connection, pool_stats
+from SQL_function import complete_mission
+
+
+def reset(user_ids):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM UserMissionStatus WHERE user_id IN %s", (user_ids,))
+            cur.execute("DELETE FROM UserCharacter WHERE user_id IN %s", (user_ids,))
+        conn.commit()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--taps", type=int, default=8, help="사용자당 동시 완료 요청 수")
+    ap.add_argument("--workers", type=int, default=32)
+    ap.add_argument("--user-base", type=int, default=900_000_000, help="테스트용 user_id 시작 값")
+    ap.add_argument("--mission-id", type=int, default=1)
+    ap.add_argument("--keep", action="store_true", help="끝난 뒤 테스트 행을 지우지 않음")
+    args = ap.parse_args()
+
+    user_ids = tuple(range(args.user_base, args.user_base + args.users))
+    reset(user_ids)
+
+    jobs = [uid for uid in user_ids for _ in range(args.taps)]
+    results = Counter()
+    errors = []
+    latencies = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(min(args.workers, len(jobs)))
+
+    def tap(uid, gate=True):
+        if gate:
+            try:
+                start_gate.wait(timeout=5)  # 첫 묶음을 최대한 동시에 출발시킨다
+            except threading.BrokenBarrierError:
+                pass
+        t0 = time.perf_counter()
+        try:
+            ok, _ = complete_mission(uid, args.mission_id)
+        except Exception as e:
+            with lock:
+                errors.append(f"user {uid}: {e!r}")
+            return
+        elapsed = time.perf_counter() - t0
+        with lock:
+            results[(uid, ok)] += 1
+            latencies.append(elapsed)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        for i, uid in enumerate(jobs):
+            ex.submit(tap, uid, i < args.workers)
+    wall = time.perf_counter() - t0
+
+    # ---- 검증 ----
+    failures = list(errors)
+    for uid in user_ids:
+        if results[(uid, True)] != 1:
+            failures.append(f"user {uid}: 성공 {results[(uid, True)]}회 (기대 1)")
+        if results[(uid, False)] != args.taps - 1:
+            failures.append(f"user {uid}: 409 {results[(uid, False)]}회 (기대 {args.taps - 1})")
+
+    today = datetime.now().date()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT user_id, COUNT(*) AS n, MIN(is_completed) AS done
+                  FROM UserMissionStatus
+                 WHERE user_id IN %s AND mission_date = %s
+                 GROUP BY user_id
+            """, (user_ids, today))
+            status = {row["user_id"]: row for row in cur.fetchall()}
+            cur.execute("""
+                SELECT user_id, total_exp, level, next_exp_req
+                  FROM UserCharacter
+                 WHERE user_id IN %s
+            """, (user_ids,))
+            chars = {row["user_id"]: row for row in cur.fetchall()}
+
+    for uid in user_ids:
+        st = status.get(uid)
+        if not st or st["n"] != 1 or not st["done"]:
+            failures.append(f"user {uid}: UserMissionStatus {st}")
+        ch = chars.get(uid)
+        if not ch or (ch["total_exp"], ch["level"], ch["next_exp_req"]) != (1, 1, 5):
+            failures.append(f"user {uid}: UserCharacter {ch}")
+
+    if not args.keep:
+        reset(user_ids)
+
+    # ---- 결과 ----
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    print(f"요청 {len(jobs)}건 ({args.users}명 × {args.taps}회), workers={args.workers}")
+    print(f"소요 {wall:.2f}s → {len(jobs) / wall:.1f} req/s")
+    print(f"지연 ms p50={ms(percentile(latencies, 0.50))} p95={ms(percentile(latencies, 0.95))} "
+          f"p99={ms(percentile(latencies, 0.99))}")
+    print(f"db_pool: {pool_stats()}")
+
+    if failures:
+        print(f"❌ 실패 {len(failures)}건")
+        for line in failures[:20]:
+            print("  -", line)
+        sys.exit(1)
+    print("✅ 사용자마다 완료 1회, XP 1회 반영")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# summary_cache.py
+# /summary/* 응답용 read-through 캐시
+#
+#   - 끝난 기간(종료일 < 오늘)은 더 바뀌지 않으므로 오래 캐시 (SUMMARY_CACHE_CLOSED_TTL)
+#   - 오늘이 포함된 기간은 키에 세대(generation) 번호를 넣고, update_emotion_summary_all 이
+#     커밋할 때마다 세대를 올려 이전 항목을 무효화 (SUMMARY_CACHE_VOLATILE_TTL 은 안전장치)
+#   - 항목마다 내용 해시 ETag 와 Last-Modified 를 함께 저장 → 조건부 요청에 304
+#   - rebuild_rollups.py 가 summary_rollup_state.rebuilt_at 을 갱신하면 (migrations/004)
+#     모든 키와 Last-Modified 에 반영 → 워커마다 SUMMARY_CACHE_REBUILD_CHECK_S 안에 새 값을 읽는다
+#
+#   SUMMARY_CACHE=0                  : 끄기 (기본 1)
+#   SUMMARY_CACHE_MAXSIZE            : 프로세스 내 최대 항목 수
+#   SUMMARY_CACHE_CLOSED_TTL         : 끝난 기간 TTL(초)
+#   SUMMARY_CACHE_VOLATILE_TTL       : 오늘 포함 기간 TTL(초)
+#   SUMMARY_CACHE_CLIENT_MAX_AGE     : 끝난 기간 응답의 Cache-Control max-age(초). 오늘 포함 기간은 no-cache
+#   SUMMARY_CACHE_REBUILD_CHECK_S    : 롤업 재계산 시각을 DB 에서 다시 읽는 주기(초)
+#   SUMMARY_CACHE_REDIS_URL          : 지정하면 redis 에 항목과 세대 번호를 두어 워커/서버끼리 공유
+#
+# redis 없이 워커가 여러 개면 세대 번호는 워커마다 따로라서, 다른 워커가 쓴 오늘 값은
+# 최대 SUMMARY_CACHE_VOLATILE_TTL 만큼 늦게 보일 수 있다.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, time as dtime
+
+import pymysql
+
+from cache_utils import MISS, LRUTTLCache
+from db import connection
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SUMMARY_CACHE", "1") == "1"
+MAXSIZE = int(os.getenv("SUMMARY_CACHE_MAXSIZE", "2048"))
+CLOSED_TTL = float(os.getenv("SUMMARY_CACHE_CLOSED_TTL", str(24 * 3600)))
+VOLATILE_TTL = float(os.getenv("SUMMARY_CACHE_VOLATILE_TTL", "5"))
+CLIENT_MAX_AGE = int(os.getenv("SUMMARY_CACHE_CLIENT_MAX_AGE", "3600"))
+REBUILD_CHECK_S = float(os.getenv("SUMMARY_CACHE_REBUILD_CHECK_S", "30"))
+REDIS_URL = os.getenv("SUMMARY_CACHE_REDIS_URL", "")
+REDIS_PREFIX = "summary_cache:"
+NO_SUCH_TABLE = 1146  # ER_NO_SUCH_TABLE
+
+
+class SummaryEntry:
+    __slots__ = ("rows", "etag", "last_modified", "closed")
+
+    def __init__(self, rows, etag, last_modified, closed):
+        self.rows = rows
+        self.etag = etag
+        self.last_modified = last_modified
+        self.closed = closed
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "rows": self.rows,
+            "etag": self.etag,
+            "last_modified": self.last_modified.isoformat(),
+            "closed": self.closed,
+        }, ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_json(cls, raw):
+        d = json.loads(raw)
+        return cls(d["rows"], d["etag"], datetime.fromisoformat(d["last_modified"]), d["closed"])
+
+
+def _etag(rows) -> str:
+    body = json.dumps(rows, ensure_ascii=False, default=str, sort_keys=True)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, enabled=ENABLED, maxsize=MAXSIZE, closed_ttl=CLOSED_TTL,
+                 volatile_ttl=VOLATILE_TTL, redis_url=REDIS_URL, rebuild_check_s=REBUILD_CHECK_S):
+        self.enabled = enabled
+        self.closed_ttl = closed_ttl
+        self.volatile_ttl = volatile_ttl
+        self.local = LRUTTLCache(maxsize=maxsize, name="summary")
+        self.redis_url = redis_url
+        self._redis = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.rebuild_check_s = rebuild_check_s
+        self._rebuilt_at = None      # 마지막 롤업 재계산 시각 (없으면 None)
+        self._rebuilt_checked = None  # 마지막으로 DB 에서 읽은 time.monotonic()
+        self._rebuilt_warned = False
+        self.loads = 0
+        self.invalidations = 0
+        self.redis_errors = 0
+
+    # ------------------------------------------------------
+    # (선택) redis 공유 백엔드
+    # ------------------------------------------------------
+    def _shared(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            with self._lock:
+                if self._redis is None:
+                    import redis  # SUMMARY_CACHE_REDIS_URL 을 쓸 때만 필요
+                    self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.2)
+        return self._redis
+
+    def _redis_call(self, fn, default=None):
+        try:
+            return fn(self._shared())
+        except Exception:
+            with self._lock:
+                self.redis_errors += 1
+            logger.warning("summary cache redis 오류 → 프로세스 내 캐시만 사용", exc_info=True)
+            return default
+
+    def generation(self) -> int:
+        if self.redis_url:
+            raw = self._redis_call(lambda r: r.get(REDIS_PREFIX + "generation"))
+            if raw is not None:
+                return int(raw)
+        return self._generation
+
+    def rebuilt_at(self):
+        """summary_rollup_state.rebuilt_at (REBUILD_CHECK_S 동안 프로세스 내에 보관)"""
+        now = time.monotonic()
+        if self._rebuilt_checked is not None and now - self._rebuilt_checked < self.rebuild_check_s:
+            return self._rebuilt_at
+        try:
+            with connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT rebuilt_at FROM summary_rollup_state WHERE id = 1")
+                    row = cursor.fetchone()
+            self._rebuilt_at = row["rebuilt_at"] if row else None
+            self._rebuilt_warned = False
+        except Exception as e:
+            missing = isinstance(e, pymysql.err.ProgrammingError) and e.args and e.args[0] == NO_SUCH_TABLE
+            if missing:
+                # 마이그레이션 004 적용 전 → 재계산한 적 없음으로 본다 (적용되면 다음 확인 때 반영)
+                self._rebuilt_at = None
+            # DB 오류면 이전 값 유지. 어느 쪽이든 다시 성공할 때까지 한 번만 기록
+            if not self._rebuilt_warned:
+                self._rebuilt_warned = True
+                if missing:
+                    logger.warning("summary_rollup_state 테이블이 없어 롤업 재계산 시각 없이 캐시합니다 (migrations/004 적용 필요)")
+                else:
+                    logger.warning("summary_rollup_state 조회 실패 → 이전 값 사용: %r", e)
+        self._rebuilt_checked = now
+        return self._rebuilt_at
+
+    # ------------------------------------------------------
+    # 조회 / 무효화
+    # ------------------------------------------------------
+    def get_or_load(self, kind, start, end_exclusive, loader) -> SummaryEntry:
+        """
+        [start, end_exclusive) 기간의 요약. 캐시에 없으면 loader() 로 읽어 저장한다.
+        loader 는 그대로 응답에 쓸 수 있는(직렬화 가능한) rows 를 돌려줘야 한다.
+        """
+        now = datetime.now()
+        closed = end_exclusive <= now.date()
+        rebuilt_at = self.rebuilt_at()
+        if not self.enabled:
+            return self._load(loader, closed, end_exclusive, now, rebuilt_at)
+
+        key = f"{kind}:{start}:{end_exclusive}"
+        if rebuilt_at is not None:
+            key += f":r{rebuilt_at.timestamp():.6f}"
+        if not closed:
+            key += f":g{self.generation()}"
+        ttl = self.closed_ttl if closed else self.volatile_ttl
+
+        entry = self.local.get(key)
+        if entry is not MISS:
+            return entry
+        if self.redis_url:
+            raw = self._redis_call(lambda r: r.get(REDIS_PREFIX + key))
+            if raw is not None:
+                entry = SummaryEntry.from_json(raw)
+                self.local.set(key, entry, ttl=ttl)
+                return entry
+
+        entry = self._load(loader, closed, end_exclusive, now, rebuilt_at)
+        self.local.set(key, entry, ttl=ttl)
+        if self.redis_url:
+            self._redis_call(lambda r: r.set(REDIS_PREFIX + key, entry.to_json(), ex=max(1, int(ttl))))
+        return entry
+
+    def _load(self, loader, closed, end_exclusive, now, rebuilt_at=None):
+        rows = loader()
+        with self._lock:
+            self.loads += 1
+        # 끝난 기간은 기간 종료 시각(기간이 끝난 뒤 롤업을 재계산했으면 그 시각)을 수정 시각으로
+        # → 워커/재적재와 무관하게 같은 값
+        if closed:
+            last_modified = datetime.combine(end_exclusive, dtime.min)
+            if rebuilt_at is not None and rebuilt_at > last_modified:
+                last_modified = rebuilt_at.replace(microsecond=0)
+        else:
+            last_modified = now.replace(microsecond=0)
+        return SummaryEntry(rows, _etag(rows), last_modified, closed)
+
+    def invalidate_volatile(self):
+        """오늘 값이 바뀌었을 때 (update_emotion_summary_all 커밋 후) 호출"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+        if self.redis_url:
+            self._redis_call(lambda r: r.incr(REDIS_PREFIX + "generation"))
+
+    def clear(self):
+        """
+        롤업 재계산처럼 끝난 기간까지 바뀌었을 때 이 프로세스와 redis 의 항목 전체 삭제
+        (다른 워커는 summary_rollup_state.rebuilt_at 이 바뀐 것을 보고 새 키로 읽는다)
+        """
+        with self._lock:
+            self._rebuilt_checked = None
+        self.local.clear()
+        self.invalidate_volatile()
+        if self.redis_url:
+            self._redis_call(lambda r: [r.delete(k) for k in r.scan_iter(match=REDIS_PREFIX + "*:*")])
+
+    def stats(self) -> dict:
+        with self._lock:
+            extra = {
+                "enabled": self.enabled,
+                "shared": bool(self.redis_url),
+                "generation": self._generation,
+                "rebuilt_at": self._rebuilt_at.isoformat() if self._rebuilt_at else None,
+                "loads": self.loads,
+                "invalidations": self.invalidations,
+                "redis_errors": self.redis_errors,
+            }
+        return {**self.local.stats(), **extra}
+
+
+summary_cache = SummaryCache()
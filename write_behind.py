@@ -0,0 +1,186 @@
+# write_behind.py
+# 로그성 INSERT 를 응답 뒤로 미루는 write-behind 버퍼 (SQL_function.log_buffer 에서 사용)
+#
+#   WRITE_BEHIND=1                    : 사용 (기본 0 = 기존처럼 요청 안에서 동기 저장)
+#   WRITE_BEHIND_QUEUE_SIZE           : 큐 최대 길이 (행 수)
+#   WRITE_BEHIND_BATCH_SIZE           : 한 번에 쓰는 최대 행 수
+#   WRITE_BEHIND_FLUSH_INTERVAL       : 첫 행이 들어온 뒤 최대 대기 시간(초)
+#   WRITE_BEHIND_PUT_TIMEOUT          : 큐가 가득 찼을 때 기다리는 시간(초). 넘으면 호출자가 동기 저장
+#   WRITE_BEHIND_DEADLETTER           : 재시도 후에도 못 쓴 행을 남길 jsonl 파일
+#
+# 종료 시(atexit, gunicorn worker_exit) 큐에 남은 행을 모두 쓴 뒤 끝난다.
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from db import connection
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("WRITE_BEHIND", "0") == "1"
+QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+PUT_TIMEOUT = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT", "0.05"))
+DEADLETTER_PATH = os.getenv("WRITE_BEHIND_DEADLETTER", "write_behind_deadletter.jsonl")
+MAX_RETRIES = 3
+
+
+class WriteBehindBuffer:
+    """statements: {테이블 이름: executemany 용 INSERT 문}"""
+
+    def __init__(self, statements, enabled=ENABLED, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, put_timeout=PUT_TIMEOUT):
+        self.statements = statements
+        self.enabled = enabled
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.failed_rows = 0
+        self.flush_total = 0.0
+        self.flush_max = 0.0
+        self.flush_last = None
+
+    def _ensure_worker(self):
+        if os.getpid() != self._pid:
+            self._reset()  # fork 된 워커는 자기 큐와 스레드를 새로 가진다
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+
+    # ------------------------------------------------------
+    # 호출자 측
+    # ------------------------------------------------------
+    def submit(self, table, row) -> bool:
+        """큐에 넣었으면 True. 비활성/종료/큐 가득 참이면 False → 호출자가 동기로 저장"""
+        if not self.enabled or self._closed:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put((table, row), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.fallbacks += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """큐가 비고 진행 중인 쓰기가 끝날 때까지 대기"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def register_shutdown(self):
+        atexit.register(self.close)
+        return self
+
+    def close(self, timeout: float = 30.0):
+        if not self.enabled or os.getpid() != self._pid:
+            return
+        self._closed = True
+        if not self.flush(timeout):
+            logger.error("write-behind 종료 시 %d행을 쓰지 못했습니다.", self._queue.qsize())
+
+    # ------------------------------------------------------
+    # 백그라운드 flusher
+    # ------------------------------------------------------
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        by_table = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                for table, rows in by_table.items():
+                    cursor.executemany(self.statements[table], rows)
+            conn.commit()
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            t0 = time.perf_counter()
+            try:
+                for attempt in range(MAX_RETRIES):
+                    try:
+                        self._write(batch)
+                        break
+                    except Exception:
+                        if attempt == MAX_RETRIES - 1:
+                            raise
+                        time.sleep(0.2 * (2 ** attempt))
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.flush_total += elapsed
+                    self.flush_max = max(self.flush_max, elapsed)
+                    self.flush_last = elapsed
+            except Exception:
+                logger.exception("write-behind 저장 실패: %d행을 %s 에 남깁니다.", len(batch), DEADLETTER_PATH)
+                self._dead_letter(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _dead_letter(self, batch):
+        with self._lock:
+            self.failed_rows += len(batch)
+        try:
+            with open(DEADLETTER_PATH, "a", encoding="utf-8") as f:
+                for table, row in batch:
+                    f.write(json.dumps({"table": table, "row": row}, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            logger.exception("dead letter 기록 실패")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "sync_fallbacks": self.fallbacks,
+                "failed_rows": self.failed_rows,
+                "flush_ms_avg": round(self.flush_total / self.batches * 1000, 3) if self.batches else None,
+                "flush_ms_max": round(self.flush_max * 1000, 3),
+                "flush_ms_last": round(self.flush_last * 1000, 3) if self.flush_last is not None else None,
+            }